@@ -0,0 +1,176 @@
+import json
+
+try:
+    import numpy as np # Optional: the same reports run in plain Python without it, just slower
+except ImportError:
+    np = None
+
+# --- Booking Analytics ---
+# Reports over the whole history ("revenue per route per vehicle type", "cancellation
+# rate by payment method") run on a columnar copy of the bookings instead of Booking
+# objects. Every text field becomes a column of small integer codes into a list of
+# its distinct values; distance and cost are float columns. A group-by then combines
+# the key columns into one integer per row and aggregates each group with np.bincount,
+# so no Python code runs per ride. The columns can be saved to a compressed .npz
+# file and loaded back without touching bookings.json.
+
+CATEGORICAL = ("vehicle_type", "start", "end", "payment_method", "status")
+NUMERIC = ("distance", "cost")
+GROUP_KEYS = CATEGORICAL + ("route",) # "route" is shorthand for ("start", "end")
+
+class BookingColumns:
+    def __init__(self, codes, categories, numbers):
+        self.codes = codes # field -> int32 codes (array, or list without NumPy)
+        self.categories = categories # field -> [distinct values]; a code indexes this list
+        self.numbers = numbers # field -> float64 values
+        self.rows = len(numbers["cost"])
+
+    @classmethod
+    def from_bookings(cls, bookings):
+        """Builds the columns in one pass over an iterable of Booking objects."""
+        lookups = {field: {} for field in CATEGORICAL}
+        codes = {field: [] for field in CATEGORICAL}
+        numbers = {field: [] for field in NUMERIC}
+        for booking in bookings:
+            for field in CATEGORICAL:
+                value = getattr(booking, field)
+                lookup = lookups[field]
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                codes[field].append(code)
+            numbers["distance"].append(booking.distance)
+            numbers["cost"].append(booking.cost)
+        categories = {field: list(lookup) for field, lookup in lookups.items()}
+        if np is not None:
+            codes = {field: np.array(column, dtype=np.int32) for field, column in codes.items()}
+            numbers = {field: np.array(column, dtype=np.float64) for field, column in numbers.items()}
+        return cls(codes, categories, numbers)
+
+    @classmethod
+    def from_store(cls, store):
+        store.load()
+        return cls.from_bookings(store.all())
+
+    def save(self, path):
+        """Writes the columns to a compressed .npz file (requires NumPy)."""
+        if np is None:
+            raise RuntimeError("Saving columns requires NumPy.")
+        np.savez_compressed(path, categories=np.array(json.dumps(self.categories)),
+                            **{f"code_{field}": column for field, column in self.codes.items()},
+                            **{f"num_{field}": column for field, column in self.numbers.items()})
+
+    @classmethod
+    def load(cls, path):
+        if np is None:
+            raise RuntimeError("Loading columns requires NumPy.")
+        with np.load(path) as data:
+            categories = json.loads(str(data["categories"]))
+            codes = {field: data[f"code_{field}"] for field in CATEGORICAL}
+            numbers = {field: data[f"num_{field}"] for field in NUMERIC}
+        return cls(codes, categories, numbers)
+
+    def group_by(self, keys):
+        """
+        Aggregates rides per distinct combination of keys (see GROUP_KEYS). Returns rows,
+        most rides first, with: rides, cancelled, cancellation_rate, revenue and distance
+        (both over rides that were not cancelled), and average_fare.
+        """
+        fields = []
+        for key in keys:
+            if key not in GROUP_KEYS:
+                raise ValueError(f"Cannot group by {key!r}; choose from {', '.join(GROUP_KEYS)}.")
+            fields += ["start", "end"] if key == "route" else [key]
+        cancelled_code = self.categories["status"].index("cancelled") if "cancelled" in self.categories["status"] else -1
+        if np is not None:
+            groups = self._group_by_numpy(fields, cancelled_code)
+        else:
+            groups = self._group_by_python(fields, cancelled_code)
+
+        rows = []
+        for combination, rides, cancelled, revenue, distance in groups:
+            values = {field: self.categories[field][code] for field, code in zip(fields, combination)}
+            row = {}
+            for key in keys:
+                row[key] = (values["start"], values["end"]) if key == "route" else values[key]
+            completed = rides - cancelled
+            row.update(rides=rides, cancelled=cancelled, cancellation_rate=cancelled / rides,
+                       revenue=round(revenue, 2), distance=round(distance, 2),
+                       average_fare=round(revenue / completed, 2) if completed else 0.0)
+            rows.append(row)
+        rows.sort(key=lambda row: row["rides"], reverse=True)
+        return rows
+
+    def _group_by_numpy(self, fields, cancelled_code):
+        # Mixed-radix encoding: one int64 per row identifies its group
+        combined = np.zeros(self.rows, dtype=np.int64)
+        key_space = 1
+        for field in fields:
+            combined = combined * len(self.categories[field]) + self.codes[field]
+            key_space *= len(self.categories[field])
+        if key_space <= max(self.rows, 1 << 16):
+            # Few possible groups (the usual case): bincount over the codes directly, no sort
+            group_ids, inverse = None, combined
+            size = key_space
+        else:
+            group_ids, inverse = np.unique(combined, return_inverse=True)
+            size = len(group_ids)
+        kept = self.codes["status"] != cancelled_code
+        rides = np.bincount(inverse, minlength=size)
+        cancelled = rides - np.bincount(inverse, weights=kept, minlength=size).astype(np.int64)
+        revenue = np.bincount(inverse, weights=np.where(kept, self.numbers["cost"], 0.0), minlength=size)
+        distance = np.bincount(inverse, weights=np.where(kept, self.numbers["distance"], 0.0), minlength=size)
+        if group_ids is None:
+            group_ids = np.flatnonzero(rides)
+            rides, cancelled, revenue, distance = rides[group_ids], cancelled[group_ids], revenue[group_ids], distance[group_ids]
+
+        groups = []
+        for i, group_id in enumerate(group_ids.tolist()):
+            combination = []
+            for field in reversed(fields): # Undo the mixed-radix encoding
+                group_id, code = divmod(group_id, len(self.categories[field]))
+                combination.append(code)
+            groups.append((combination[::-1], int(rides[i]), int(cancelled[i]), float(revenue[i]), float(distance[i])))
+        return groups
+
+    def _group_by_python(self, fields, cancelled_code):
+        totals = {} # combination -> [rides, cancelled, revenue, distance]
+        columns = [self.codes[field] for field in fields]
+        statuses, costs, distances = self.codes["status"], self.numbers["cost"], self.numbers["distance"]
+        for row in range(self.rows):
+            combination = tuple(column[row] for column in columns)
+            total = totals.get(combination)
+            if total is None:
+                total = totals[combination] = [0, 0, 0.0, 0.0]
+            total[0] += 1
+            if statuses[row] == cancelled_code:
+                total[1] += 1
+            else:
+                total[2] += costs[row]
+                total[3] += distances[row]
+        return [(list(combination), *total) for combination, total in totals.items()]
+
+
+def revenue_by_route_and_vehicle(columns):
+    return columns.group_by(["route", "vehicle_type"])
+
+def cancellation_rate_by_payment_method(columns):
+    return columns.group_by(["payment_method"])
+
+def format_report(rows, limit=None):
+    """Renders group_by rows as an aligned text table."""
+    rows = rows[:limit] if limit else rows
+    if not rows:
+        return "No bookings."
+    keys = [key for key in rows[0] if key not in ("rides", "cancelled", "cancellation_rate", "revenue",
+                                                    "distance", "average_fare")]
+    def label(row, key):
+        return " → ".join(row[key]) if key == "route" else str(row[key])
+    widths = {key: max(len(key), *(len(label(row, key)) for row in rows)) for key in keys}
+    lines = ["  ".join(key.ljust(widths[key]) for key in keys) +
+             f"  {'rides':>9}  {'cancelled':>9}  {'rate':>6}  {'revenue':>14}  {'avg fare':>9}"]
+    for row in rows:
+        lines.append("  ".join(label(row, key).ljust(widths[key]) for key in keys) +
+                     f"  {row['rides']:>9}  {row['cancelled']:>9}  {row['cancellation_rate']:>6.1%}"
+                     f"  ₱{row['revenue']:>13,.2f}  ₱{row['average_fare']:>8,.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,356 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from booking import Booking
+from bookingsystem import BookingSystem, DISTANCE_MATRIX, VEHICLE_TYPES, get_distance
+
+# --- Benchmark Suite ---
+# python benchmarks.py runs every case and writes benchmark_results.json; pass
+# --compare old.json to print the change against an earlier run and exit non-zero on
+# regressions. Each case reports the median (and min) of several repeats, in seconds
+# per operation, plus operations per second. Everything runs in a temporary directory,
+# so real bookings, logs and caches are never touched. GUI cases need a display; the
+# root window is withdrawn, and without a display they are recorded as skipped.
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+ROUTES = list(DISTANCE_MATRIX)
+
+def measure(function, repeat=5, number=1, setup=None):
+    """Times number calls of function, repeat times. Returns seconds per call (median and min)."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - started) / number)
+    median = statistics.median(samples)
+    return {"seconds": median, "min_seconds": min(samples), "ops_per_second": 1 / median if median > 0 else 0.0,
+            "repeat": repeat, "number": number}
+
+def make_bookings(count):
+    bookings = []
+    for i in range(count):
+        start, end = ROUTES[i % len(ROUTES)]
+        vehicle_type = VEHICLE_TYPES[i % len(VEHICLE_TYPES)]
+        distance = get_distance(start, end)
+        bookings.append(Booking(vehicle_type, start, end, distance, 40.0 + distance * 10, "Cash", booking_id=f"B{i:09d}"))
+    return bookings
+
+
+# --- Booking core ---
+
+def bench_booking_core(results, size, tmp, backend="json"):
+    file = os.path.join(tmp, f"bookings_{size}.{'db' if backend == 'sqlite' else 'json'}")
+    log_file = os.path.join(tmp, f"booking_log_{backend}_{size}.txt")
+    event_file = os.path.join(tmp, f"booking_events_{backend}_{size}.jsonl")
+
+    def fresh_system():
+        return BookingSystem(file, log_file, journal=True, event_file=event_file)
+
+    system = fresh_system()
+    system.load()
+    started = time.perf_counter()
+    system.add_bookings(make_bookings(size))
+    system.save()
+    results[f"core.{backend}.populate[{size}]"] = {"seconds": time.perf_counter() - started, "repeat": 1, "number": 1}
+
+    start, end = ROUTES[0]
+    operations = min(size, 1000)
+    results[f"core.{backend}.book[{size}]"] = measure(
+        lambda: system.book("Car (4-seater)", start, end, "Cash"), repeat=3, number=operations)
+    ids = iter([f"B{i:09d}" for i in range(size)])
+    results[f"core.{backend}.cancel[{size}]"] = measure(lambda: system.cancel(next(ids)), repeat=3,
+                                                       number=min(operations, size // 3))
+    results[f"core.{backend}.save[{size}]"] = measure(system.save, repeat=3)
+
+    def cold_load():
+        fresh_system().load()
+    results[f"core.{backend}.load_cold[{size}]"] = measure(cold_load, repeat=3)
+    results[f"core.{backend}.load_unchanged[{size}]"] = measure(system.load, repeat=5, number=100)
+    results[f"core.{backend}.find_page[{size}]"] = measure(
+        lambda: system.find_bookings(status="booked", limit=50, offset=size // 2), repeat=5, number=10)
+    close_system(system)
+
+def close_system(system):
+    """Flushes and closes a system's files before its temporary directory is deleted."""
+    system.save()
+    system.store.close()
+    system.log.close()
+    if system.events:
+        system.events.close()
+
+
+def bench_pricing(results):
+    pairs = [(a, b) for a, b in ROUTES] * 100
+    def distances():
+        for start, end in pairs:
+            get_distance(start, end)
+    timing = measure(distances, repeat=5)
+    results["pricing.get_distance"] = _per_item(timing, len(pairs))
+
+    system = BookingSystem(event_file=None)
+    def costs():
+        for i, (start, end) in enumerate(pairs):
+            system.calculate_cost(VEHICLE_TYPES[i % 3], 3.5)
+    results["pricing.calculate_cost"] = _per_item(measure(costs, repeat=5), len(pairs))
+
+    def table_quotes():
+        for i, (start, end) in enumerate(pairs):
+            system.quote_fare(start, end, VEHICLE_TYPES[i % 3])
+    results["pricing.quote_fare"] = _per_item(measure(table_quotes, repeat=5), len(pairs))
+
+    from pricing import SurgePricing
+    surged = BookingSystem(event_file=None, surge=SurgePricing())
+    def surge_quotes():
+        for i, (start, end) in enumerate(pairs):
+            surged.quote_fare(start, end, VEHICLE_TYPES[i % 3])
+    results["pricing.quote_fare_surge"] = _per_item(measure(surge_quotes, repeat=5), len(pairs))
+    def demand_updates():
+        for start, _ in pairs:
+            surged.surge.tracker.record(start)
+    results["pricing.demand_record"] = _per_item(measure(demand_updates, repeat=5), len(pairs))
+
+    starts = [start for start, _ in pairs] * 10
+    ends = [end for _, end in pairs] * 10
+    vehicles = [VEHICLE_TYPES[i % 3] for i in range(len(starts))]
+    results["pricing.quote_many"] = _per_item(measure(lambda: system.quote_many(starts, ends, vehicles), repeat=5),
+                                              len(starts))
+
+def _per_item(timing, items):
+    """Rescales a timing of one batch call into seconds per item."""
+    timing = dict(timing)
+    timing["seconds"] /= items
+    timing["min_seconds"] /= items
+    timing["ops_per_second"] = 1 / timing["seconds"] if timing["seconds"] > 0 else 0.0
+    timing["number"] = items
+    return timing
+
+
+def bench_routing(results, stop_counts=(3, 6, 10, 12), seed=0):
+    """Times optimize_stop_order on random points in a 5 km square; the campus map has too few locations."""
+    import math
+    import random
+    from routing import optimize_stop_order
+    rng = random.Random(seed)
+    for stops in stop_counts:
+        points = {f"P{i}": (rng.uniform(0, 5), rng.uniform(0, 5)) for i in range(stops + 1)}
+        euclidean = lambda a, b: math.dist(points[a], points[b])
+        dropoffs = [f"P{i}" for i in range(1, stops + 1)]
+        results[f"routing.optimize_stop_order[{stops}]"] = measure(
+            lambda: optimize_stop_order("P0", dropoffs, distance=euclidean), repeat=3)
+
+
+def bench_event_replay(results, event_path, tmp):
+    from events import iter_events, replay, restore
+    from storage import JsonBookingStore
+    results["events.replay"] = measure(lambda: replay(iter_events(event_path)), repeat=3)
+    target = os.path.join(tmp, "replayed.json")
+    results["events.restore_json"] = measure(lambda: restore(event_path, JsonBookingStore(target)), repeat=3)
+
+
+def bench_analytics(results, size, tmp):
+    import analytics
+    bookings = make_bookings(size)
+    for i in range(0, size, 10):
+        bookings[i].status = "cancelled"
+    results[f"analytics.build_columns[{size}]"] = measure(lambda: analytics.BookingColumns.from_bookings(bookings), repeat=3)
+    columns = analytics.BookingColumns.from_bookings(bookings)
+    for keys in (["vehicle_type"], ["route", "vehicle_type"], ["payment_method"], ["status"]):
+        results[f"analytics.group_by[{'+'.join(keys)},{size}]"] = measure(lambda: columns.group_by(keys), repeat=5)
+    if analytics.np is not None:
+        path = os.path.join(tmp, f"columns_{size}.npz")
+        columns.save(path)
+        results[f"analytics.load_columns[{size}]"] = measure(lambda: analytics.BookingColumns.load(path), repeat=3)
+
+
+# --- Images and GUI ---
+
+def _make_assets(asset_dir):
+    from PIL import Image
+    from bookingsystem import ROUTE_IMAGE_MAP
+    os.makedirs(asset_dir, exist_ok=True)
+    route_map = sorted(set(ROUTE_IMAGE_MAP.values()))[0]
+    Image.effect_noise((1200, 520), 64).convert("RGB").save(os.path.join(asset_dir, route_map)) # ~1 MB, like the shipped maps
+    Image.effect_noise((512, 512), 64).convert("RGB").save(os.path.join(asset_dir, "driver_car.png"))
+    return route_map
+
+@contextlib.contextmanager
+def isolated_images(tmp):
+    """Points the GUI's asset folder and thumbnail cache into tmp for the duration. Yields the route map's name."""
+    import gui
+    from imagecache import thumbnail_cache
+    route_map = _make_assets(os.path.join(tmp, "assets"))
+    saved = (gui.IMAGE_BASE_PATH, thumbnail_cache.cache_dir)
+    gui.IMAGE_BASE_PATH = os.path.join(tmp, "assets")
+    thumbnail_cache.cache_dir = os.path.join(tmp, "thumbnails")
+    try:
+        yield route_map
+    finally:
+        gui.IMAGE_BASE_PATH, thumbnail_cache.cache_dir = saved
+
+def bench_images(results, tmp, with_tk):
+    import gui
+    from imagecache import thumbnail_cache
+    with isolated_images(tmp) as route_map:
+        cases = {"route_map": (route_map, (375, 160), False), "circular_icon": ("driver_car.png", (100, 100), True)}
+        for name, (filename, size, circular) in cases.items():
+            results[f"images.load_pil_image.cold.{name}"] = measure(
+                lambda: gui.load_pil_image(filename, size, circular), repeat=5, setup=thumbnail_cache.clear)
+            results[f"images.load_pil_image.thumbnail_hit.{name}"] = measure(
+                lambda: gui.load_pil_image(filename, size, circular), repeat=5, number=10)
+            if with_tk:
+                def cold():
+                    thumbnail_cache.clear()
+                    gui._image_references.clear()
+                results[f"images.load_image.cold.{name}"] = measure(
+                    lambda: gui.load_image(filename, size, circular), repeat=5, setup=cold)
+                results[f"images.load_image.warm.{name}"] = measure(
+                    lambda: gui.load_image(filename, size, circular), repeat=5, number=1000)
+
+def bench_gui(results, tmp, history_sizes):
+    import gui
+    with isolated_images(tmp):
+        _bench_gui_pages(results, tmp, history_sizes)
+
+def _bench_gui_pages(results, tmp, history_sizes):
+    import gui
+    saved_cwd = os.getcwd()
+    for size in history_sizes:
+        work_dir = os.path.join(tmp, f"gui_{size}")
+        os.makedirs(work_dir)
+        os.chdir(work_dir) # App keeps its bookings and logs in the working directory
+        try:
+            seed = BookingSystem("bookings.json", journal=True)
+            seed.add_bookings(make_bookings(size))
+            close_system(seed)
+            app = gui.App(warm_up_pages=False)
+            app.withdraw()
+            try:
+                history = app.get_frame("HistoryPage")
+                def redraw_history():
+                    history.update_history_display()
+                    app.update_idletasks() # Include the deferred row render
+                results[f"gui.HistoryPage.update_history_display[{size}]"] = measure(redraw_history, repeat=5)
+
+                app.update_booking_details(pickup_location="CEA", dropoff_location="iTech",
+                                           distance=get_distance("CEA", "iTech"), vehicle_type="Enavroom-vroom")
+                map_page = app.get_frame("MapPage")
+                def show_map():
+                    map_page.on_show()
+                    app.update_idletasks()
+                results[f"gui.MapPage.on_show[{size}]"] = measure(show_map, repeat=5)
+            finally:
+                close_system(app.booking_system)
+                app.destroy()
+        finally:
+            os.chdir(saved_cwd)
+
+def tk_available():
+    """Returns None if a Tk root can be created, else the reason it cannot."""
+    try:
+        import tkinter
+        root = tkinter.Tk()
+        root.withdraw()
+        root.destroy()
+        return None
+    except Exception as e: # TclError without a display, ImportError without Tk
+        return str(e).splitlines()[0]
+
+
+# --- Running and comparing ---
+
+def run(sizes, backends, history_sizes, event_path=None, skip_gui=False):
+    results, skipped = {}, {}
+    with tempfile.TemporaryDirectory(prefix="enavroom_bench_") as tmp:
+        for backend in backends:
+            for size in sizes:
+                print(f"Running booking core ({backend}, {size} bookings)...", file=sys.stderr)
+                bench_booking_core(results, size, tmp, backend)
+        print("Running pricing...", file=sys.stderr)
+        bench_pricing(results)
+        print("Running routing...", file=sys.stderr)
+        bench_routing(results)
+        for size in sizes:
+            print(f"Running analytics ({size} bookings)...", file=sys.stderr)
+            bench_analytics(results, size, tmp)
+        if event_path:
+            bench_event_replay(results, event_path, tmp)
+
+        reason = "disabled with --skip-gui" if skip_gui else tk_available()
+        try:
+            print("Running images...", file=sys.stderr)
+            bench_images(results, tmp, with_tk=reason is None)
+        except ImportError as e:
+            skipped["images"] = str(e)
+        if reason is None:
+            print("Running GUI...", file=sys.stderr)
+            bench_gui(results, tmp, history_sizes)
+        else:
+            skipped["images.load_image"] = skipped["gui"] = reason
+    return {"meta": _metadata(), "results": results, "skipped": skipped}
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+            "platform": platform.platform(), "machine": platform.machine(), "commit": commit}
+
+def compare(previous, current, threshold):
+    """Prints each shared case's change in seconds per op. Returns the cases slower by more than threshold."""
+    regressions = []
+    print(f"{'case':<58} {'before':>12} {'after':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        before = previous["results"].get(name)
+        if not before or not before["seconds"]:
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<58} {before['seconds']:>12.3e} {result['seconds']:>12.3e} {change:>+8.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the booking core, images and GUI hot paths.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="booking counts for the core cases")
+    parser.add_argument("--backends", default="json", help="comma-separated: json, sqlite")
+    parser.add_argument("--history-sizes", default="1000,100000", help="booking counts behind the GUI cases")
+    parser.add_argument("--events", help="also time replaying this event log (e.g. recorded production traffic)")
+    parser.add_argument("--skip-gui", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown counted as a regression (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    report = run([int(size) for size in args.sizes.split(",")], args.backends.split(","),
+                 [int(size) for size in args.history_sizes.split(",")], args.events, args.skip_gui)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, reason in report["skipped"].items():
+        print(f"Skipped {name}: {reason}", file=sys.stderr)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import sys
+import uuid
+
+class BookingError(Exception):
+    """Raised when a quote or booking request cannot be fulfilled; the message is user-facing."""
+    pass
+
+class DuplicateBookingError(BookingError):
+    """Raised when a booking's id is already taken in the store."""
+    def __init__(self, booking_id):
+        super().__init__(f"A booking with ID {booking_id} already exists.")
+        self.booking_id = booking_id
+
+# --- Booking Record ---
+class Booking:
+    # No per-instance __dict__: with millions of bookings resident this roughly
+    # halves the size of each record.
+    __slots__ = ("id", "vehicle_type", "start", "end", "distance", "cost", "payment_method", "status", "stops")
+
+    def __init__(self, vehicle_type, start, end, distance, cost, payment_method, status="booked", booking_id=None, stops=()):
+        # The full 128-bit uuid: ids are primary keys, and an 8-character prefix (32 bits)
+        # already collides about once per 100k bookings
+        self.id = booking_id if booking_id else uuid.uuid4().hex
+        # These fields only ever hold a handful of distinct values; interning makes every
+        # booking share one string object per value instead of each JSON decode making its own.
+        self.vehicle_type = sys.intern(vehicle_type)
+        self.start = sys.intern(start)
+        self.end = sys.intern(end)
+        self.distance = distance
+        self.cost = cost
+        self.payment_method = sys.intern(payment_method)
+        self.status = sys.intern(status)
+        # Drop-offs visited between start and end on a multi-stop trip, in ride order
+        self.stops = tuple(sys.intern(stop) for stop in stops)
+
+    def route(self):
+        """Every location on the trip, pick-up first."""
+        return [self.start, *self.stops, self.end]
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "vehicle_type": self.vehicle_type,
+            "start": self.start,
+            "end": self.end,
+            "distance": self.distance,
+            "cost": self.cost,
+            "payment_method": self.payment_method,
+            "status": self.status
+        }
+        if self.stops: # Single-leg bookings keep the original record shape
+            data["stops"] = list(self.stops)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["vehicle_type"],
+            data["start"],
+            data["end"],
+            data["distance"],
+            data["cost"],
+            data["payment_method"],
+            data["status"],
+            data["id"],
+            data.get("stops", ())
+        )
@@ -0,0 +1,175 @@
+import json
+import time
+
+from booking import BookingError, DuplicateBookingError
+from bookingsystem import Booking, BookingSystem, get_distance, LOCATIONS, VEHICLE_TYPES, PAYMENT_METHODS
+
+# --- Headless Booking Service ---
+# The ride flow (validate the route, quote it, book it, cancel it) without any UI.
+# The GUI pages and the command line both go through this class, and it imports
+# neither Tk nor PIL, so scripts and servers can use it without a display.
+
+class BookingService:
+    def __init__(self, booking_system=None, file="bookings.json", log_file="booking_log.txt", journal=True,
+                 event_file="booking_events.jsonl", surge=None):
+        if booking_system is None:
+            booking_system = BookingSystem(file, log_file, journal=journal, event_file=event_file, surge=surge)
+            booking_system.load()
+        self.booking_system = booking_system
+
+    def validate_route(self, start, end):
+        """Returns the trip distance, or raises BookingError if the route cannot be booked."""
+        if not start or not end:
+            raise BookingError("Please select both pick-up and drop-off locations.")
+        if start not in LOCATIONS or end not in LOCATIONS:
+            unknown = start if start not in LOCATIONS else end
+            raise BookingError(f"Unknown location: {unknown}.")
+        if start == end:
+            raise BookingError("Pick-up and drop-off locations cannot be the same.")
+        distance = get_distance(start, end)
+        if distance == 0.0:
+            raise BookingError(f"No route defined between {start} and {end}. Please select different locations.")
+        return distance
+
+    def quote(self, start, end, vehicle_type):
+        """Prices a trip without booking it."""
+        if vehicle_type not in VEHICLE_TYPES:
+            raise BookingError(f"Unknown vehicle type: {vehicle_type}.")
+        distance = self.validate_route(start, end)
+        return {
+            "vehicle_type": vehicle_type,
+            "start": start,
+            "end": end,
+            "distance": distance,
+            "cost": self.booking_system.quote_fare(start, end, vehicle_type),
+        }
+
+    def quote_trip(self, pickup, dropoffs, vehicle_type, optimize=True):
+        """Prices a pick-up plus several drop-offs, visited in the shortest order unless optimize is False."""
+        if vehicle_type not in VEHICLE_TYPES:
+            raise BookingError(f"Unknown vehicle type: {vehicle_type}.")
+        if not dropoffs:
+            raise BookingError("Please select at least one drop-off location.")
+        for location in [pickup, *dropoffs]:
+            if location not in LOCATIONS:
+                raise BookingError(f"Unknown location: {location}.")
+        plan = self.booking_system.plan_trip(vehicle_type, pickup, dropoffs, optimize)
+        if plan is None:
+            raise BookingError("No route connects all of the selected stops. Please select different locations.")
+        ordered, distance, cost = plan
+        return {
+            "vehicle_type": vehicle_type,
+            "start": pickup,
+            "stops": ordered,
+            "distance": distance,
+            "cost": cost,
+        }
+
+    def book(self, vehicle_type, start, end, payment_method="Cash"):
+        """Books a trip and returns the Booking."""
+        if not vehicle_type:
+            raise BookingError("Please select a vehicle type before booking.")
+        if payment_method not in PAYMENT_METHODS:
+            raise BookingError(f"Unknown payment method: {payment_method}.")
+        self.quote(start, end, vehicle_type)
+        booking = self.booking_system.book(vehicle_type, start, end, payment_method)
+        if booking is None:
+            raise BookingError("Failed to confirm booking.")
+        return booking
+
+    def book_multi_stop(self, vehicle_type, pickup, dropoffs, payment_method="Cash", optimize=True):
+        """Books a pick-up plus several drop-offs as one trip and returns the Booking."""
+        if not vehicle_type:
+            raise BookingError("Please select a vehicle type before booking.")
+        if payment_method not in PAYMENT_METHODS:
+            raise BookingError(f"Unknown payment method: {payment_method}.")
+        self.quote_trip(pickup, dropoffs, vehicle_type, optimize)
+        booking = self.booking_system.book_multi_stop(vehicle_type, pickup, dropoffs, payment_method, optimize)
+        if booking is None:
+            raise BookingError("Failed to confirm booking.")
+        return booking
+
+    def cancel(self, booking_id):
+        """Cancels a booking. Returns False if no booking has that id."""
+        return bool(booking_id) and self.booking_system.cancel(booking_id)
+
+    def list_bookings(self, status=None, start=None, end=None, vehicle_type=None, limit=None, offset=0):
+        self.booking_system.load()
+        return self.booking_system.find_bookings(status=status, start=start, end=end,
+                                                 vehicle_type=vehicle_type, limit=limit, offset=offset)
+
+    def price_request(self, request):
+        """Validates one booking request (a dict) and returns an unsaved, priced Booking."""
+        if not isinstance(request, dict):
+            raise BookingError("Request is not a JSON object.")
+        vehicle_type = request.get("vehicle_type")
+        payment_method = request.get("payment_method", "Cash")
+        if not vehicle_type:
+            raise BookingError("Please select a vehicle type before booking.")
+        if payment_method not in PAYMENT_METHODS:
+            raise BookingError(f"Unknown payment method: {payment_method}.")
+        quote = self.quote(request.get("start"), request.get("end"), vehicle_type)
+        return Booking(vehicle_type, quote["start"], quote["end"], quote["distance"], quote["cost"], payment_method)
+
+    @staticmethod
+    def iter_requests(path):
+        """
+        Yields (record number, request or None, error or None) from a JSON-lines file,
+        one line at a time, so a file of any size is never held in memory. A file that
+        is a single JSON array is decoded whole.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            f.seek(0)
+            if first == "[":
+                for number, request in enumerate(json.load(f), start=1):
+                    yield number, request, None
+                return
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line), None
+                except json.JSONDecodeError as e:
+                    yield number, None, f"Invalid JSON: {e}"
+
+    def _commit_batch(self, batch, rejected):
+        """Stores a bulk-import batch of (record number, Booking). Returns how many were booked."""
+        left_out = {id(booking) for booking in self.booking_system.add_bookings([booking for _, booking in batch])}
+        for number, booking in batch:
+            if id(booking) in left_out:
+                rejected.append((number, str(DuplicateBookingError(booking.id))))
+        return len(batch) - len(left_out)
+
+    def bulk_import(self, path, batch_size=500):
+        """
+        Streams booking requests from a JSON-lines (or JSON array) file and books them in
+        batches, each committed with one storage write and one log write. Each request
+        needs vehicle_type, start and end, and may give payment_method.
+        Returns a report: {"booked", "rejected": [(record number, reason)], "seconds", "per_second"}.
+        """
+        started = time.perf_counter()
+        booked, rejected, batch = 0, [], []
+        for number, request, error in self.iter_requests(path):
+            try:
+                if error:
+                    raise BookingError(error)
+                batch.append((number, self.price_request(request)))
+            except BookingError as e:
+                rejected.append((number, str(e)))
+                continue
+            if len(batch) >= batch_size:
+                booked += self._commit_batch(batch, rejected)
+                batch = []
+        booked += self._commit_batch(batch, rejected)
+
+        seconds = time.perf_counter() - started
+        processed = booked + len(rejected)
+        return {
+            "booked": booked,
+            "rejected": rejected,
+            "seconds": seconds,
+            "per_second": processed / seconds if seconds > 0 else 0.0,
+        }
@@ -1,10 +1,35 @@
-import json
-import uuid
+import contextlib
+import logging
 import math
-import os
+
+import instrumentation
+from booking import Booking
+from booklog import open_log
+from events import open_event_log
+from routing import optimize_stop_order
+from storage import open_store
+
+logger = logging.getLogger(__name__)
+
+np = None # NumPy, imported by _numpy() when quote_many() first runs; it falls back to plain Python without it
+_numpy_imported = False
+
+def _numpy():
+    """Imports NumPy on first use (it would add ~85 ms to every start-up), or returns None if it is missing."""
+    global np, _numpy_imported
+    if not _numpy_imported:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_imported = True
+    return np
 
 # --- Booking System Logic ---
 LOCATIONS = ["PUP Main", "CEA", "Hasmin", "iTech", "COC", "PUP LHS", "Condotel"]
+VEHICLE_TYPES = ["Enavroom-vroom", "Car (4-seater)", "Car (6-seater)"]
+PAYMENT_METHODS = ["Cash", "Wallet"]
 
 DISTANCE_MATRIX = {
     ("PUP Main", "CEA"): 2.0,
@@ -75,50 +100,127 @@ ROUTE_IMAGE_MAP = {
     ("Condotel", "PUP LHS"): "pup_lhs_to_condotel.png",
 }
 
+# Locations interned to integer ids, and a dense symmetric distance table indexed by
+# them, so a lookup is two list indexes instead of up to two tuple-key dict probes.
+# DISTANCE_MATRIX is treated as a weighted graph: pairs it defines keep their direct
+# distance, and any other connected pair gets its shortest multi-hop distance, found
+# once with Floyd-Warshall whenever the graph changes.
+LOCATION_IDS = {}
+DISTANCE_TABLE = []
+DISTANCE_ARRAY = None # NumPy copy of DISTANCE_TABLE for vectorized quoting, built by _distance_array()
+_distance_array_version = None # _graph_version DISTANCE_ARRAY was built for
+SHORTEST_TABLE = [] # SHORTEST_TABLE[i][j]: shortest path length, math.inf if unreachable
+NEXT_HOP = [] # NEXT_HOP[i][j]: id of the location after i on the shortest path to j
+_graph_size = (0, 0) # (len(LOCATIONS), len(DISTANCE_MATRIX)) the tables were built for
+_graph_version = 0 # Bumped on every rebuild, so tables derived from distances know when they are stale
+
+def build_distance_table():
+    """Rebuilds LOCATION_IDS and the distance and routing tables from LOCATIONS and DISTANCE_MATRIX."""
+    global _graph_size, _graph_version
+    LOCATION_IDS.clear()
+    LOCATION_IDS.update({name: i for i, name in enumerate(LOCATIONS)})
+    size = len(LOCATIONS)
+    direct = [[math.inf] * size for _ in range(size)]
+    for i in range(size):
+        direct[i][i] = 0.0
+    for (a, b), km in DISTANCE_MATRIX.items():
+        direct[LOCATION_IDS[a]][LOCATION_IDS[b]] = km
+        direct[LOCATION_IDS[b]][LOCATION_IDS[a]] = km
+
+    # Floyd-Warshall: O(n^3) once per graph change, then every query is O(1)
+    shortest = [row[:] for row in direct]
+    next_hop = [[j if shortest[i][j] < math.inf else None for j in range(size)] for i in range(size)]
+    for k in range(size):
+        row_k = shortest[k]
+        for i in range(size):
+            via_k = shortest[i][k]
+            if via_k == math.inf:
+                continue
+            row_i = shortest[i]
+            for j in range(size):
+                if via_k + row_k[j] < row_i[j]:
+                    row_i[j] = via_k + row_k[j]
+                    next_hop[i][j] = next_hop[i][k]
+
+    SHORTEST_TABLE[:] = shortest
+    NEXT_HOP[:] = next_hop
+    DISTANCE_TABLE[:] = [
+        [direct[i][j] if direct[i][j] < math.inf else (shortest[i][j] if shortest[i][j] < math.inf else 0.0)
+         for j in range(size)]
+        for i in range(size)
+    ]
+    _graph_size = (len(LOCATIONS), len(DISTANCE_MATRIX))
+    _graph_version += 1
+
+build_distance_table()
+
+def _distance_array():
+    """DISTANCE_TABLE as a NumPy array, rebuilt after the graph changes. Call only when _numpy() is not None."""
+    global DISTANCE_ARRAY, _distance_array_version
+    if _distance_array_version != _graph_version:
+        DISTANCE_ARRAY = np.array(DISTANCE_TABLE, dtype=np.float64)
+        _distance_array_version = _graph_version
+    return DISTANCE_ARRAY
+
+def _ensure_tables():
+    # Catches locations or routes added straight to the module-level lists and dicts
+    if _graph_size != (len(LOCATIONS), len(DISTANCE_MATRIX)):
+        build_distance_table()
+
+def graph_version():
+    """A number that changes whenever locations or distances do; caches of derived data compare against it."""
+    _ensure_tables()
+    return _graph_version
+
+def add_route(start, end, distance):
+    """Adds (or changes) a direct route, registering new locations, and rebuilds the routing tables."""
+    for name in (start, end):
+        if name not in LOCATIONS:
+            LOCATIONS.append(name)
+    if (end, start) in DISTANCE_MATRIX:
+        del DISTANCE_MATRIX[(end, start)]
+    DISTANCE_MATRIX[(start, end)] = distance
+    build_distance_table()
+
 def get_distance(start, end):
     """Calculates distance between two locations."""
-    if (start, end) in DISTANCE_MATRIX:
-        return DISTANCE_MATRIX[(start, end)]
-    elif (end, start) in DISTANCE_MATRIX:
-        return DISTANCE_MATRIX[(end, start)]
-    else:
+    _ensure_tables()
+    start_id = LOCATION_IDS.get(start)
+    end_id = LOCATION_IDS.get(end)
+    if start_id is None or end_id is None:
         return 0.0
+    return DISTANCE_TABLE[start_id][end_id]
 
-class Booking:
-    def __init__(self, vehicle_type, start, end, distance, cost, payment_method, status="booked", booking_id=None):
-        self.id = booking_id if booking_id else str(uuid.uuid4())[:8]
-        self.vehicle_type = vehicle_type
-        self.start = start
-        self.end = end
-        self.distance = distance
-        self.cost = cost
-        self.payment_method = payment_method
-        self.status = status
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "vehicle_type": self.vehicle_type,
-            "start": self.start,
-            "end": self.end,
-            "distance": self.distance,
-            "cost": self.cost,
-            "payment_method": self.payment_method,
-            "status": self.status
-        }
+def get_route(start, end):
+    """
+    Returns the locations a trip passes through, from start to end inclusive: just the two
+    ends for a directly defined route, the shortest chain of hops otherwise. [] if unreachable.
+    """
+    _ensure_tables()
+    start_id = LOCATION_IDS.get(start)
+    end_id = LOCATION_IDS.get(end)
+    if start_id is None or end_id is None or NEXT_HOP[start_id][end_id] is None:
+        return []
+    if start_id == end_id:
+        return [start]
+    if (start, end) in DISTANCE_MATRIX or (end, start) in DISTANCE_MATRIX:
+        return [start, end]
+    hops = [start_id]
+    while hops[-1] != end_id:
+        hops.append(NEXT_HOP[hops[-1]][end_id])
+    return [LOCATIONS[i] for i in hops]
 
-    @classmethod
-    def from_dict(cls, data):
-        return cls(
-            data["vehicle_type"],
-            data["start"],
-            data["end"],
-            data["distance"],
-            data["cost"],
-            data["payment_method"],
-            data["status"],
-            data["id"]
-        )
+def shortest_path(start, end):
+    """Returns (distance, hops) of the shortest path, even where a longer direct route is defined."""
+    _ensure_tables()
+    start_id = LOCATION_IDS.get(start)
+    end_id = LOCATION_IDS.get(end)
+    if start_id is None or end_id is None or NEXT_HOP[start_id][end_id] is None:
+        return math.inf, []
+    hops = [start_id]
+    while hops[-1] != end_id:
+        hops.append(NEXT_HOP[hops[-1]][end_id])
+    return SHORTEST_TABLE[start_id][end_id], [LOCATIONS[i] for i in hops]
 
 class BookingSystem:
     BASE_FARE = 40.0
@@ -126,76 +228,241 @@ class BookingSystem:
     RATE_PER_KM_ENACAR_4_SEATER = 40.0
     RATE_PER_KM_ENACAR_6_SEATER = 60.0
 
-    def __init__(self, file="bookings.json", log_file="booking_log.txt"):
+    def __init__(self, file="bookings.json", log_file="booking_log.txt", journal=False, store=None,
+                 event_file="booking_events.jsonl", surge=None):
         self.file = file
         self.log_file = log_file
-        self.bookings = []
-
-    def calculate_cost(self, vehicle_type, distance):
-        cost = self.BASE_FARE
-        if vehicle_type == "Enavroom-vroom":
-            cost += distance * self.RATE_PER_KM_ENA_VROOM
-        elif vehicle_type == "Car (4-seater)":
-            cost += distance * self.RATE_PER_KM_ENACAR_4_SEATER
-        elif vehicle_type == "Car (6-seater)":
-            cost += distance * self.RATE_PER_KM_ENACAR_6_SEATER
+        self.log = open_log(log_file) # Buffered; a background thread writes entries out
+        self.events = open_event_log(event_file) if event_file else None # Machine-readable twin of the log
+        # Any BookingStore can be plugged in; by default the file name picks JSON or SQLite.
+        # In journal mode the JSON store appends each change instead of rewriting the file.
+        self.store = store if store is not None else open_store(file, journal=journal)
+        self.rate_per_km = {
+            "Enavroom-vroom": self.RATE_PER_KM_ENA_VROOM,
+            "Car (4-seater)": self.RATE_PER_KM_ENACAR_4_SEATER,
+            "Car (6-seater)": self.RATE_PER_KM_ENACAR_6_SEATER,
+        }
+        self.surge = surge # Optional pricing.SurgePricing; fixed fares when None
+        # Fare for every (start, end, vehicle type), rebuilt when the tariff or the routes change.
+        # Change rates through set_tariff(), which bumps tariff_version, not rate_per_km directly.
+        self.tariff_version = 0
+        self._quote_table = {}
+        self._quote_table_version = None
+        self.quote_table()
+
+    def set_tariff(self, base_fare=None, rate_per_km=None):
+        """
+        Changes the base fare and/or per-km rates ({vehicle type: rate}, merged into the
+        current ones). Quotes use the new tariff from the next call on.
+        """
+        if base_fare is not None:
+            self.BASE_FARE = base_fare
+        if rate_per_km:
+            self.rate_per_km.update(rate_per_km)
+        self.tariff_version += 1
+        if self.surge is not None:
+            self.surge.clear_cache()
+
+    def quote_table(self):
+        """Fares for every routable location pair and vehicle type: {(start, end, vehicle type): cost}."""
+        _ensure_tables()
+        if self._quote_table_version != (self.tariff_version, _graph_version):
+            table = {}
+            for start, start_id in LOCATION_IDS.items():
+                for end, end_id in LOCATION_IDS.items():
+                    distance = DISTANCE_TABLE[start_id][end_id]
+                    if distance == 0.0:
+                        continue
+                    for vehicle_type in self.rate_per_km:
+                        table[(start, end, vehicle_type)] = self.calculate_cost(vehicle_type, distance)
+            self._quote_table = table # Swapped in whole, so readers never see a partial table
+            self._quote_table_version = (self.tariff_version, _graph_version)
+        return self._quote_table
+
+    @property
+    def generation(self):
+        """Changes whenever the bookings change, here or on disk (as of the last load())."""
+        return self.store.generation
+
+    @property
+    def bookings(self):
+        """Every booking, oldest first. Prefer find_bookings() on large histories."""
+        return self.store.all()
+
+    def calculate_cost(self, vehicle_type, distance, pickup=None):
+        # Unknown vehicle types pay the base fare only
+        cost = self.BASE_FARE + distance * self.rate_per_km.get(vehicle_type, 0.0)
+        if pickup is not None and self.surge is not None:
+            cost *= self.surge.multiplier(pickup, vehicle_type)
         return round(cost, 2)
 
+    def quote_fare(self, start, end, vehicle_type):
+        """Cost of a trip from start to end, including any surge at start: one quote_table() lookup."""
+        cost = self.quote_table().get((start, end, vehicle_type))
+        if cost is None: # Unknown vehicle type or no route; priced the slow way, as before
+            cost = self.calculate_cost(vehicle_type, get_distance(start, end))
+        if self.surge is None:
+            return cost
+        return self.surge.fare(start, end, vehicle_type, lambda v: cost)
+
+    def quote_many(self, starts, ends, vehicle_types):
+        """
+        Prices whole sequences of trips in one call, for batch repricing and analytics.
+        Locations may be given as names or LOCATION_IDS ids. Undefined routes get distance 0.
+        Returns (distances, costs): NumPy arrays when NumPy is installed, otherwise lists.
+        """
+        _ensure_tables()
+        start_ids = [LOCATION_IDS[s] if isinstance(s, str) else s for s in starts]
+        end_ids = [LOCATION_IDS[e] if isinstance(e, str) else e for e in ends]
+        if _numpy() is not None:
+            rate_codes = {vehicle_type: i for i, vehicle_type in enumerate(self.rate_per_km)}
+            rates = np.array(list(self.rate_per_km.values()) + [0.0])
+            unknown = len(rate_codes)
+            vehicle_codes = np.fromiter((rate_codes.get(v, unknown) for v in vehicle_types), dtype=np.intp)
+            distances = _distance_array()[np.asarray(start_ids, dtype=np.intp), np.asarray(end_ids, dtype=np.intp)]
+            costs = np.round(self.BASE_FARE + distances * rates[vehicle_codes], 2)
+            return distances, costs
+        distances = [DISTANCE_TABLE[s][e] for s, e in zip(start_ids, end_ids)]
+        costs = [self.calculate_cost(v, d) for v, d in zip(vehicle_types, distances)]
+        return distances, costs
+
+    @contextlib.contextmanager
+    def _changing(self):
+        """
+        Holds the event log's lock and then the store's, always in that order, so that
+        across processes each change reaches the store and the event log in one order.
+        """
+        if self.events is None:
+            with self.store.lock:
+                yield
+        else:
+            with self.events.lock, self.store.lock:
+                yield
+
+    @instrumentation.timed("booking.book")
     def book(self, vehicle_type, start, end, payment_method):
         distance = get_distance(start, end)
         if distance == 0.0 and start != end:
-            print(f"ERROR: Route from {start} to {end} not defined.")
+            logger.error("Route from %s to %s not defined.", start, end)
             return None
-        cost = self.calculate_cost(vehicle_type, distance)
+        cost = self.quote_fare(start, end, vehicle_type)
         booking = Booking(vehicle_type, start, end, distance, cost, payment_method)
-        self.bookings.append(booking)
-        self.save()
-        self.log_to_txt(booking, action="Booked")
+        with self._changing(): # Log entries and events are written in the same order as the stored changes
+            self.store.add(booking)
+            self._record_booked([booking])
+        return booking
+
+    def plan_trip(self, vehicle_type, pickup, dropoffs, optimize=True):
+        """
+        Prices a pick-up plus several drop-offs as one trip. With optimize, the drop-offs
+        are reordered to minimize total distance; otherwise they are visited as given.
+        Returns (drop-offs in ride order, distance, cost), or None if a leg has no route.
+        """
+        if optimize:
+            ordered, distance = optimize_stop_order(pickup, dropoffs, get_distance)
+        else:
+            ordered = [stop for stop in dropoffs if stop != pickup]
+            distance = sum(get_distance(a, b) for a, b in zip([pickup] + ordered, ordered))
+        if not ordered:
+            logger.error("Trip from %s has no drop-offs.", pickup)
+            return None
+        for a, b in zip([pickup] + ordered, ordered):
+            if a != b and get_distance(a, b) == 0.0:
+                logger.error("Route from %s to %s not defined.", a, b)
+                return None
+        return ordered, round(distance, 2), self.calculate_cost(vehicle_type, distance, pickup)
+
+    @instrumentation.timed("booking.book_multi_stop")
+    def book_multi_stop(self, vehicle_type, pickup, dropoffs, payment_method, optimize=True):
+        """Books a pick-up plus several drop-offs as a single booking ending at the last drop-off."""
+        plan = self.plan_trip(vehicle_type, pickup, dropoffs, optimize)
+        if plan is None:
+            return None
+        ordered, distance, cost = plan
+        booking = Booking(vehicle_type, pickup, ordered[-1], distance, cost, payment_method, stops=ordered[:-1])
+        with self._changing():
+            self.store.add(booking)
+            self._record_booked([booking])
         return booking
 
+    @instrumentation.timed("booking.add_bookings")
+    def add_bookings(self, bookings):
+        """
+        Stores already-priced bookings as one batch: one storage write and one log write.
+        Returns the bookings left out because their id was already taken; the rest are stored.
+        """
+        if not bookings:
+            return []
+        with self._changing():
+            rejected = self.store.add_many(bookings)
+            if rejected:
+                rejected_ids = {id(booking) for booking in rejected}
+                bookings = [booking for booking in bookings if id(booking) not in rejected_ids]
+            self._record_booked(bookings)
+        return rejected
+
+    @instrumentation.timed("booking.cancel")
     def cancel(self, booking_id):
-        for booking in self.bookings:
-            if booking.id == booking_id:
-                booking.status = "cancelled"
-                self.save()
-                self.log_to_txt(booking, action="Cancelled")
-                return True
-        return False
+        with self._changing():
+            booking = self.store.set_status(booking_id, "cancelled")
+            if booking is None:
+                return False
+            self.log_to_txt(booking, action="Cancelled")
+            instrumentation.count("bookings.cancelled")
+            if self.events:
+                self.events.cancelled(booking)
+        return True
+
+    def get_booking(self, booking_id):
+        return self.store.get(booking_id)
+
+    def find_bookings(self, status=None, start=None, end=None, vehicle_type=None, limit=None, offset=0):
+        """Filtered history query, answered by the store (indexed for SQLite)."""
+        return self.store.query(status=status, start=start, end=end, vehicle_type=vehicle_type,
+                                limit=limit, offset=offset)
 
+    def count_bookings(self, status=None, start=None, end=None, vehicle_type=None):
+        return self.store.count(status=status, start=start, end=end, vehicle_type=vehicle_type)
+
+    @instrumentation.timed("booking.save")
     def save(self):
-        with open(self.file, "w") as f:
-            json.dump([b.to_dict() for b in self.bookings], f, indent=2)
+        self.store.compact()
+        self.log.flush()
+        if self.events:
+            self.events.flush()
 
-    def log_to_txt(self, booking, action="Booked"):
-        log_entry = (
+    @staticmethod
+    def _log_entry(booking, action):
+        return (
             f"{action.upper()} | ID: {booking.id} | "
-            f"{booking.vehicle_type} | {booking.start} → {booking.end} | "
+            f"{booking.vehicle_type} | {' → '.join(booking.route())} | "
             f"{booking.distance:.1f} km | ₱{booking.cost:.2f} | "
             f"{booking.payment_method} | STATUS: {booking.status}\n"
         )
-        with open(self.log_file, "a", encoding="utf-8") as log_file:
-            log_file.write(log_entry)
 
-    def load(self):
-        self.bookings = []
-        try:
-            if os.path.exists(self.file):
-                with open(self.file, "r") as f:
-                    data = json.load(f)
-                    for item in data:
-                        self.bookings.append(Booking.from_dict(item))
-            else:
-                print(f"DEBUG: {self.file} not found. Starting with empty bookings.")
-        except json.JSONDecodeError as e:
-            print(f"ERROR: Could not decode JSON from {self.file}: {e}. Starting with empty bookings.")
-        # Optionally load from log file as a fallback (not recommended for primary data)
-        # This would require parsing log entries back into Booking objects, which is complex
-        # For now, we'll stick to bookings.json as the source of truth
+    def log_to_txt(self, booking, action="Booked"):
+        self.log.write(self._log_entry(booking, action))
+
+    def _record_booked(self, bookings):
+        instrumentation.count("bookings.booked", len(bookings))
+        if self.surge is not None:
+            self.surge.record_bookings(bookings)
+        self.log.write("".join(self._log_entry(booking, "Booked") for booking in bookings))
+        if self.events:
+            self.events.booked(bookings)
+
+    @instrumentation.timed("booking.load")
+    def load(self, force=False):
+        """Brings the bookings up to date with storage; a no-op when nothing changed on disk."""
+        self.store.load(force=force)
+        # The booking store is the source of truth; if it is lost, events.restore() rebuilds
+        # it from the event log (python main.py replay booking_events.jsonl)
 
     def clear_all(self):
-        """Clears all bookings and the booking log file."""
-        self.bookings = []
-        self.save()
-        if os.path.exists(self.log_file):
-            open(self.log_file, "w").close()
-            print(f"DEBUG: {self.log_file} has been cleared.")
\ No newline at end of file
+        """Clears all bookings, the booking log file and its rotated segments."""
+        with self._changing():
+            self.store.clear()
+            self.log.clear()
+            if self.events: # Recorded, not erased: replay then starts over from here too
+                self.events.cleared()
+            logger.info("%s has been cleared.", self.log_file)
\ No newline at end of file
@@ -0,0 +1,195 @@
+import atexit
+import gzip
+import logging
+import os
+import shutil
+import threading
+
+logger = logging.getLogger(__name__)
+
+# --- Booking Log Writer ---
+# booking_log.txt is a human-readable audit trail next to the booking store (which
+# stays the source of truth). Entries are buffered in memory and written through one
+# open handle, either by a background thread every flush_interval seconds or as soon
+# as flush_bytes are waiting. Once the file passes max_bytes it is rotated to
+# booking_log.txt.1, keeping `backups` old segments, so the log never grows without
+# bound. Rotating is only a rename; with compress set, the background thread gzips
+# the segment to .1.gz afterwards, so a write never waits for compression.
+
+class BookingLog:
+    def __init__(self, path, flush_interval=1.0, flush_bytes=64 * 1024,
+                 max_bytes=10 * 1024 * 1024, backups=5, compress=True):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self._lock = threading.RLock()
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._file = None
+        self._closed = False
+        self._compress_pending = compress # Also picks up segments a previous run left uncompressed
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name=f"log-flusher:{path}", daemon=True)
+        self._flusher.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def write(self, text):
+        """Queues text for the log; it reaches the file within flush_interval seconds."""
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"{self.path} log is closed.")
+            self._buffer.append(text)
+            self._buffered_bytes += len(text)
+            if self._buffered_bytes >= self.flush_bytes:
+                self.flush()
+
+    def flush(self):
+        """Writes everything buffered so far, rotating first if the file is full."""
+        with self._lock:
+            if not self._buffer:
+                return
+            data = "".join(self._buffer)
+            self._buffer = []
+            self._buffered_bytes = 0
+            handle = self._handle()
+            handle.write(data)
+            handle.flush()
+            if self.max_bytes and handle.tell() >= self.max_bytes:
+                self.rotate()
+
+    def _handle(self):
+        """The open log file, reopened if another process rotated or deleted it under us."""
+        if self._file is not None:
+            try:
+                same_file = os.path.samestat(os.fstat(self._file.fileno()), os.stat(self.path))
+            except FileNotFoundError:
+                same_file = False
+            if not same_file:
+                self._file.close()
+                self._file = None
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def rotate(self):
+        """Moves the current log to <path>.1 (shifting older segments up) and starts a new one."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not os.path.exists(self.path):
+                return
+            for ext in (".gz", ""):
+                if os.path.exists(self._segment(self.backups, ext)):
+                    os.remove(self._segment(self.backups, ext))
+            for number in range(self.backups - 1, 0, -1):
+                for ext in (".gz", ""): # Compressed or not (yet, or before a change of the compress setting)
+                    if os.path.exists(self._segment(number, ext)):
+                        os.replace(self._segment(number, ext), self._segment(number + 1, ext))
+            if self.backups < 1:
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self._segment(1))
+                if self.compress:
+                    self._compress_pending = True
+                    self._wake.set()
+            logger.info("Rotated %s", self.path)
+
+    def _compress_segments(self):
+        """Gzips uncompressed segments. Runs on the flusher thread, holding the lock only to rename."""
+        self._compress_pending = False
+        for number in range(1, self.backups + 1):
+            with self._lock:
+                if not os.path.exists(self._segment(number)):
+                    continue
+                src = open(self._segment(number), "rb") # Follows the file if a rotation renames it meanwhile
+            tmp_path = f"{self.path}.compressing.gz"
+            try:
+                with src, gzip.open(tmp_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                    compressed = os.fstat(src.fileno())
+                with self._lock:
+                    # Rotations may have shifted the segment up, or dropped it, while we worked
+                    for current in range(1, self.backups + 1):
+                        segment = self._segment(current)
+                        if os.path.exists(segment) and os.path.samestat(os.stat(segment), compressed):
+                            os.replace(tmp_path, self._segment(current, ".gz"))
+                            os.remove(segment)
+                            break
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _segment(self, number, ext=""):
+        return f"{self.path}.{number}{ext}"
+
+    def segments(self):
+        """Paths of the rotated segments that exist, newest first."""
+        found = []
+        for number in range(1, self.backups + 2):
+            for ext in ("", ".gz"):
+                if os.path.exists(self._segment(number, ext)):
+                    found.append(self._segment(number, ext))
+        return found
+
+    def clear(self):
+        """Empties the log: drops buffered entries, truncates the file and deletes rotated segments."""
+        with self._lock:
+            self._buffer = []
+            self._buffered_bytes = 0
+            self._handle().truncate(0)
+            for segment in self.segments():
+                os.remove(segment)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._wake.set()
+        if threading.current_thread() is not self._flusher:
+            self._flusher.join() # Let a pending compression finish
+
+    def _flush_periodically(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed # Checked first, so a rotation done by close() is still compressed
+            try:
+                self.flush()
+                if self._compress_pending:
+                    self._compress_segments()
+            except OSError as e:
+                logger.error("Could not write %s: %s", self.path, e)
+            if closing:
+                return
+
+
+_open_logs = {}
+_open_logs_lock = threading.Lock()
+
+def open_log(path, **options):
+    """Returns the process-wide BookingLog for path, so every writer shares one buffer and handle."""
+    key = os.path.abspath(path)
+    with _open_logs_lock:
+        log = _open_logs.get(key)
+        if log is None or log.closed:
+            log = _open_logs[key] = BookingLog(path, **options)
+        return log
+
+@atexit.register
+def close_all_logs():
+    """Flushes every open log; runs at interpreter exit so buffered entries are not lost."""
+    with _open_logs_lock:
+        for log in _open_logs.values():
+            log.close()
@@ -0,0 +1,150 @@
+import argparse
+import sys
+import time
+
+import instrumentation
+from booking_service import BookingService, BookingError
+from events import restore
+from pricing import SurgePricing
+
+# --- Command Line Interface ---
+# python main.py <command> ... runs a single booking operation without opening the GUI.
+
+def format_booking(booking):
+    return (f"{booking.id} | {booking.vehicle_type} | {' → '.join(booking.route())} | "
+            f"{booking.distance:.1f} km | ₱{booking.cost:.2f} | {booking.payment_method} | {booking.status}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="enavroom", description="Enavroom booking commands (no GUI).")
+    parser.add_argument("--file", default="bookings.json", help="booking store (.json, or .db for SQLite)")
+    parser.add_argument("--log-file", default="booking_log.txt")
+    parser.add_argument("--event-file", default="booking_events.jsonl", help="structured event log (JSON lines)")
+    parser.add_argument("--log-level", help="DEBUG, INFO, WARNING (default) or ERROR")
+    parser.add_argument("--metrics", help="record timers and counters and write them here (.prom or .json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    quote = commands.add_parser("quote", help="price a trip without booking it")
+    quote.add_argument("start")
+    quote.add_argument("end", nargs="+", help="one drop-off, or several for a multi-stop trip")
+    quote.add_argument("--vehicle", default="Enavroom-vroom")
+    quote.add_argument("--keep-order", action="store_true", help="visit drop-offs in the order given")
+
+    book = commands.add_parser("book", help="book a trip")
+    book.add_argument("start")
+    book.add_argument("end", nargs="+", help="one drop-off, or several for a multi-stop trip")
+    book.add_argument("--vehicle", default="Enavroom-vroom")
+    book.add_argument("--payment", default="Cash")
+    book.add_argument("--keep-order", action="store_true", help="visit drop-offs in the order given")
+
+    cancel = commands.add_parser("cancel", help="cancel a booking")
+    cancel.add_argument("booking_id")
+
+    listing = commands.add_parser("list", help="list bookings")
+    listing.add_argument("--status")
+    listing.add_argument("--start")
+    listing.add_argument("--end")
+    listing.add_argument("--vehicle")
+    listing.add_argument("--limit", type=int)
+    listing.add_argument("--offset", type=int, default=0)
+
+    bulk = commands.add_parser("bulk-import", help="book every request in a JSON or JSON-lines file")
+    bulk.add_argument("path")
+    bulk.add_argument("--batch-size", type=int, default=500, help="requests committed per storage write")
+
+    replay = commands.add_parser("replay", help="rebuild the booking store (--file) from an event log")
+    replay.add_argument("path", help="event log to replay (JSON lines)")
+    replay.add_argument("--replace", action="store_true", help="overwrite a store that already has bookings")
+
+    report = commands.add_parser("report", help="ride counts, revenue and cancellation rates per group")
+    report.add_argument("--by", default="route,vehicle_type",
+                        help="comma-separated: vehicle_type, route, start, end, payment_method, status")
+    report.add_argument("--limit", type=int, help="show only the busiest groups")
+    report.add_argument("--columns", help="read a column file written by --export instead of the store")
+    report.add_argument("--export", help="also save the history as a column file (.npz, needs NumPy)")
+
+    serve = commands.add_parser("serve", help="serve bookings over HTTP/JSON on the loopback interface")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--surge", action="store_true", help="raise fares where recent demand is high")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    instrumentation.configure_logging(args.log_level)
+    if args.metrics:
+        instrumentation.enable()
+    surge = SurgePricing() if getattr(args, "surge", False) else None
+    service = BookingService(file=args.file, log_file=args.log_file, event_file=args.event_file, surge=surge)
+    try:
+        if args.command == "quote":
+            if len(args.end) == 1:
+                quote = service.quote(args.start, args.end[0], args.vehicle)
+                route = [quote["start"], quote["end"]]
+            else:
+                quote = service.quote_trip(args.start, args.end, args.vehicle, optimize=not args.keep_order)
+                route = [quote["start"], *quote["stops"]]
+            print(f"{quote['vehicle_type']} | {' → '.join(route)} | "
+                  f"{quote['distance']:.1f} km | ₱{quote['cost']:.2f}")
+        elif args.command == "book":
+            if len(args.end) == 1:
+                booking = service.book(args.vehicle, args.start, args.end[0], args.payment)
+            else:
+                booking = service.book_multi_stop(args.vehicle, args.start, args.end, args.payment,
+                                                  optimize=not args.keep_order)
+            print(format_booking(booking))
+        elif args.command == "cancel":
+            if not service.cancel(args.booking_id):
+                print(f"ERROR: No booking with ID {args.booking_id}.", file=sys.stderr)
+                return 1
+            print(f"Cancelled {args.booking_id}")
+        elif args.command == "list":
+            for booking in service.list_bookings(args.status, args.start, args.end, args.vehicle, args.limit, args.offset):
+                print(format_booking(booking))
+        elif args.command == "replay":
+            store = service.booking_system.store
+            if store.count() and not args.replace:
+                print(f"ERROR: {args.file} already has bookings; pass --replace to overwrite it.", file=sys.stderr)
+                return 1
+            started = time.perf_counter()
+            restored = restore(args.path, store)
+            print(f"Restored {restored} bookings into {args.file} in {time.perf_counter() - started:.2f} s")
+        elif args.command == "report":
+            import analytics
+            if args.columns:
+                columns = analytics.BookingColumns.load(args.columns)
+            else:
+                columns = analytics.BookingColumns.from_store(service.booking_system.store)
+            if args.export:
+                columns.save(args.export)
+            try:
+                rows = columns.group_by(args.by.split(","))
+            except ValueError as e: # Unknown group key
+                print(f"ERROR: {e}", file=sys.stderr)
+                return 1
+            print(analytics.format_report(rows, args.limit))
+        elif args.command == "serve":
+            import asyncio
+            from server import BookingServer
+            try:
+                asyncio.run(BookingServer(service, args.host, args.port).serve_forever())
+            except ValueError as e: # Non-loopback address
+                print(f"ERROR: {e}", file=sys.stderr)
+                return 1
+            except KeyboardInterrupt:
+                service.booking_system.save()
+        elif args.command == "bulk-import":
+            report = service.bulk_import(args.path, batch_size=args.batch_size)
+            for number, reason in report["rejected"]:
+                print(f"Rejected request {number}: {reason}", file=sys.stderr)
+            print(f"Booked {report['booked']}, rejected {len(report['rejected'])} "
+                  f"in {report['seconds']:.2f} s ({report['per_second']:.0f} requests/s)")
+    except BookingError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            instrumentation.export(args.metrics)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import heapq
+import math
+import random
+import time
+from collections import deque
+
+from bookingsystem import LOCATIONS, VEHICLE_TYPES, get_distance, graph_version, shortest_path
+
+# --- Driver Dispatch ---
+# A pool of drivers parked at map locations, and a matching engine that gives each
+# ride the nearest free driver of the requested vehicle type. Vehicle types are the
+# fare classes of BookingSystem.rate_per_km, so a motorcycle driver never picks up
+# a car fare. The same engine drives the GUI and the discrete-event simulation.
+
+AVERAGE_SPEED_KPH = 20 # City traffic around campus
+MIN_ETA_MINUTES = 1 # A driver at the pick-up point still needs a moment to arrive
+
+FIRST_NAMES = ["Juan", "Maria", "Jose", "Ana", "Mark", "Grace", "Paolo", "Liza", "Carlo", "Bea", "Miguel", "Joy"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores", "Ramos", "Aquino"]
+
+def travel_minutes(km):
+    return km / AVERAGE_SPEED_KPH * 60
+
+class Driver:
+    __slots__ = ("id", "name", "plate", "vehicle_type", "location", "available")
+
+    def __init__(self, driver_id, name, plate, vehicle_type, location):
+        self.id = driver_id
+        self.name = name
+        self.plate = plate
+        self.vehicle_type = vehicle_type
+        self.location = location
+        self.available = True
+
+class Assignment:
+    """A driver matched to a ride, with how far away they were and when they will arrive."""
+    __slots__ = ("driver", "pickup", "distance", "eta_minutes")
+
+    def __init__(self, driver, pickup, distance):
+        self.driver = driver
+        self.pickup = pickup
+        self.distance = distance
+        self.eta_minutes = max(MIN_ETA_MINUTES, math.ceil(travel_minutes(distance)))
+
+class DriverPool:
+    """Available drivers bucketed by vehicle type and location, so matching never scans the fleet."""
+    def __init__(self, drivers=()):
+        self.drivers = {}
+        self.available = {vehicle_type: {} for vehicle_type in VEHICLE_TYPES} # type -> location -> {id: driver}
+        for driver in drivers:
+            self.add(driver)
+
+    @classmethod
+    def generate(cls, drivers_per_type, seed=None):
+        """Builds a fleet of drivers_per_type drivers for every vehicle type, parked at random locations."""
+        rng = random.Random(seed)
+        drivers = []
+        for vehicle_type in VEHICLE_TYPES:
+            for _ in range(drivers_per_type):
+                plate = "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ") for _ in range(3)) + f" {rng.randint(100, 9999)}"
+                drivers.append(Driver(f"D{len(drivers) + 1:05d}", f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                                      plate, vehicle_type, rng.choice(LOCATIONS)))
+        return cls(drivers)
+
+    def add(self, driver):
+        self.drivers[driver.id] = driver
+        if driver.available:
+            self._park(driver)
+
+    def _park(self, driver):
+        self.available[driver.vehicle_type].setdefault(driver.location, {})[driver.id] = driver
+
+    def take(self, vehicle_type, location):
+        """Removes and returns a free driver of that type at that location, or None."""
+        parked = self.available.get(vehicle_type, {}).get(location)
+        if not parked:
+            return None
+        driver = parked.pop(next(iter(parked))) # Longest-waiting driver first
+        driver.available = False
+        return driver
+
+    def release(self, driver, location=None):
+        """Makes a driver available again, at location if they have moved (e.g. a drop-off)."""
+        if location is not None:
+            driver.location = location
+        driver.available = True
+        self._park(driver)
+
+    def available_count(self, vehicle_type=None):
+        types = [vehicle_type] if vehicle_type else VEHICLE_TYPES
+        return sum(len(parked) for t in types for parked in self.available.get(t, {}).values())
+
+class MatchingEngine:
+    def __init__(self, pool):
+        self.pool = pool
+        self._search_orders = {} # pick-up -> [(shortest-path distance, location)] nearest first
+        self._graph_version = graph_version()
+
+    def _search_order(self, pickup):
+        version = graph_version()
+        if version != self._graph_version: # Locations or distances changed since the orders were cached
+            self._search_orders.clear()
+            self._graph_version = version
+        order = self._search_orders.get(pickup)
+        if order is None:
+            order = [(0.0, pickup)]
+            for location in LOCATIONS:
+                # A driver takes the shortest way to the pick-up, even where a longer direct route is defined
+                distance, hops = shortest_path(location, pickup)
+                if location != pickup and hops:
+                    order.append((distance, location))
+            order.sort()
+            self._search_orders[pickup] = order
+        return order
+
+    def match(self, vehicle_type, pickup):
+        """
+        Assigns the nearest free driver of vehicle_type to a ride from pickup.
+        Cost is O(locations), whatever the fleet size. Returns an Assignment, or None
+        if every driver of that type is busy.
+        """
+        for distance, location in self._search_order(pickup):
+            driver = self.pool.take(vehicle_type, location)
+            if driver is not None:
+                return Assignment(driver, pickup, distance)
+        return None
+
+    def release(self, assignment, location=None):
+        """Frees the assigned driver: at location after a ride, or where they were if it was cancelled."""
+        self.pool.release(assignment.driver, location)
+
+
+# --- Discrete-event Simulation ---
+
+class DispatchSimulation:
+    """
+    Replays a simulated stream of ride requests against the matching engine. Time is in
+    simulated minutes and advances from event to event, so hours of traffic take
+    seconds. Requests nobody can serve wait in a FIFO per vehicle type and give up after
+    patience_minutes.
+    """
+    def __init__(self, drivers_per_type=1000, requests_per_minute=500, duration_minutes=60,
+                 patience_minutes=10, seed=0):
+        self.rng = random.Random(seed)
+        self.engine = MatchingEngine(DriverPool.generate(drivers_per_type, seed=seed))
+        self.requests_per_minute = requests_per_minute
+        self.duration_minutes = duration_minutes
+        self.patience_minutes = patience_minutes
+        self.routes = [(a, b) for a in LOCATIONS for b in LOCATIONS if a != b and get_distance(a, b) > 0.0]
+
+    def run(self):
+        """Runs the simulation and returns a report dict of match latency and throughput."""
+        events = [] # (minute, sequence, kind, payload)
+        sequence = 0
+        waiting = {vehicle_type: deque() for vehicle_type in VEHICLE_TYPES} # FIFO of pending requests
+        waits, etas = [], []
+        requested = abandoned = completed = 0
+        match_seconds = 0.0
+        match_calls = 0
+
+        def schedule(minute, kind, payload):
+            nonlocal sequence
+            sequence += 1
+            heapq.heappush(events, (minute, sequence, kind, payload))
+
+        def assign(request, assignment, now):
+            request["matched"] = True
+            waits.append(now - request["requested_at"])
+            etas.append(assignment.eta_minutes)
+            trip = assignment.eta_minutes + travel_minutes(get_distance(request["start"], request["end"]))
+            schedule(now + trip, "complete", (assignment, request["end"]))
+
+        # Poisson arrivals: exponential gaps between requests
+        minute = self.rng.expovariate(self.requests_per_minute)
+        while minute < self.duration_minutes:
+            start, end = self.rng.choice(self.routes)
+            schedule(minute, "request", {"vehicle_type": self.rng.choice(VEHICLE_TYPES), "start": start,
+                                         "end": end, "requested_at": minute, "matched": False})
+            minute += self.rng.expovariate(self.requests_per_minute)
+
+        started = time.perf_counter()
+        now = 0.0
+        while events:
+            now, _, kind, payload = heapq.heappop(events)
+            if kind == "request":
+                requested += 1
+                t0 = time.perf_counter()
+                assignment = self.engine.match(payload["vehicle_type"], payload["start"])
+                match_seconds += time.perf_counter() - t0
+                match_calls += 1
+                if assignment:
+                    assign(payload, assignment, now)
+                else:
+                    waiting[payload["vehicle_type"]].append(payload)
+                    schedule(now + self.patience_minutes, "give_up", payload)
+            elif kind == "complete":
+                assignment, dropoff = payload
+                completed += 1
+                self.engine.release(assignment, dropoff)
+                queue = waiting[assignment.driver.vehicle_type]
+                while queue and queue[0]["matched"] is None: # Skip requests that already gave up
+                    queue.popleft()
+                if queue:
+                    t0 = time.perf_counter()
+                    next_assignment = self.engine.match(queue[0]["vehicle_type"], queue[0]["start"])
+                    match_seconds += time.perf_counter() - t0
+                    match_calls += 1
+                    if next_assignment: # None only if the freed driver cannot reach that pick-up
+                        assign(queue.popleft(), next_assignment, now)
+            elif kind == "give_up" and not payload["matched"]:
+                payload["matched"] = None
+                abandoned += 1
+        wall_seconds = time.perf_counter() - started
+
+        waits.sort()
+        matched = len(waits)
+        return {
+            "drivers": len(self.engine.pool.drivers),
+            "requests": requested,
+            "matched": matched,
+            "abandoned": abandoned,
+            "completed": completed,
+            "simulated_minutes": now,
+            "mean_wait_minutes": sum(waits) / matched if matched else 0.0,
+            "p95_wait_minutes": waits[int(0.95 * (matched - 1))] if matched else 0.0,
+            "mean_eta_minutes": sum(etas) / matched if matched else 0.0,
+            "mean_match_microseconds": match_seconds / match_calls * 1e6 if match_calls else 0.0,
+            "wall_seconds": wall_seconds,
+            "requests_per_second": requested / wall_seconds if wall_seconds > 0 else 0.0,
+        }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Simulate driver dispatch and report match latency and throughput.")
+    parser.add_argument("--drivers", type=int, default=1000, help="drivers per vehicle type")
+    parser.add_argument("--rate", type=float, default=500, help="ride requests per simulated minute")
+    parser.add_argument("--minutes", type=float, default=60, help="simulated minutes of requests")
+    parser.add_argument("--patience", type=float, default=10, help="minutes a rider waits before giving up")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = DispatchSimulation(args.drivers, args.rate, args.minutes, args.patience, args.seed).run()
+    for key, value in report.items():
+        print(f"{key:>24}: {value:.3f}" if isinstance(value, float) else f"{key:>24}: {value}")
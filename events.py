@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from booking import Booking
+from storage import StoreLock
+
+logger = logging.getLogger(__name__)
+
+# --- Booking Event Log ---
+# booking_log.txt is for people; booking_events.jsonl is for programs. Every change is
+# one JSON line with a sequence number and a timestamp:
+#
+#   {"seq": 1, "ts": 1760000000.123, "event": "booked", "booking": {...Booking.to_dict()}}
+#   {"seq": 2, "ts": 1760000004.567, "event": "cancelled", "id": "a1b2c3d4"}
+#   {"seq": 3, "ts": 1760000009.012, "event": "cleared"}
+#
+# replay() folds the stream back into bookings, so a lost bookings.json can be rebuilt
+# and recorded traffic can be fed to benchmarks. Several processes may share one file
+# (see StoreLock): each append happens under an exclusive lock on <path>.lock, and the
+# next seq is taken from the file itself, so numbers never repeat. BookingSystem holds
+# that lock around the store change as well, so events land in the file in the order
+# the changes were made. Events are written straight through (the file is never
+# rotated: recovery needs the whole stream).
+
+class EventLog:
+    def __init__(self, path):
+        self.path = path
+        self.lock = StoreLock(path + ".lock")
+        self.seq = 0 # Last seq in the file, valid while the file is _end bytes long
+        self._end = None
+        self._file = None
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _handle(self):
+        """The open event file, reopened if it was replaced or deleted under us."""
+        if self._file is not None:
+            try:
+                same_file = os.path.samestat(os.fstat(self._file.fileno()), os.stat(self.path))
+            except FileNotFoundError:
+                same_file = False
+            if not same_file:
+                self._file.close()
+                self._file = None
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._end = None
+        return self._file
+
+    def _emit(self, events):
+        with self.lock:
+            if self._closed:
+                raise ValueError(f"{self.path} event log is closed.")
+            handle = self._handle()
+            end = os.fstat(handle.fileno()).st_size
+            prefix = b""
+            if end != self._end: # Another process appended since our last write
+                self.seq = last_seq(self.path)
+                if end and not _ends_with_newline(self.path):
+                    prefix = b"\n" # Fence off a line torn by a writer that crashed
+            lines = []
+            now = round(time.time(), 3)
+            for event in events:
+                self.seq += 1
+                lines.append(json.dumps({"seq": self.seq, "ts": now, **event}, ensure_ascii=False) + "\n")
+            data = prefix + "".join(lines).encode("utf-8")
+            handle.write(data)
+            handle.flush()
+            self._end = end + len(data)
+
+    def booked(self, bookings):
+        self._emit({"event": "booked", "booking": booking.to_dict()} for booking in bookings)
+
+    def cancelled(self, booking):
+        self._emit([{"event": "cancelled", "id": booking.id}])
+
+    def cleared(self):
+        self._emit([{"event": "cleared"}])
+
+    def flush(self):
+        pass # Every event is written as it happens; kept so callers can treat this like the text log
+
+    def close(self):
+        with self.lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.lock.close()
+
+_event_logs = {}
+_event_logs_lock = threading.Lock()
+
+def open_event_log(path):
+    """Returns the process-wide EventLog for path, so sequence numbers never repeat within a process."""
+    key = os.path.abspath(path)
+    with _event_logs_lock:
+        if key not in _event_logs or _event_logs[key].closed:
+            _event_logs[key] = EventLog(path)
+        return _event_logs[key]
+
+def last_seq(path):
+    """Sequence number of the last complete event in the file, or 0."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 64 * 1024)) # The last line is well within this
+            lines = f.read().splitlines(keepends=True)
+    except FileNotFoundError:
+        return 0
+    for line in reversed(lines):
+        try:
+            if line.endswith(b"\n"):
+                return json.loads(line)["seq"]
+        except (ValueError, KeyError):
+            continue
+    return 0
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+def iter_events(path):
+    """Yields every event as a dict, oldest first. A torn final line is skipped."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                logger.error("Skipping incomplete event at the end of %s.", path)
+                break
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                logger.error("Skipping unreadable event in %s: %s", path, e)
+
+def replay(events):
+    """Folds an event stream into the bookings it describes, oldest first."""
+    bookings = {} # id -> Booking; dicts keep insertion order
+    early_cancels = set() # Cancelled before their booking appeared (logs written by older versions)
+    for event in events:
+        kind = event.get("event")
+        if kind == "booked":
+            booking = Booking.from_dict(event["booking"])
+            if booking.id in bookings:
+                # The store keeps the first booking under an id, so replay does too
+                logger.error("Event %s books %s again; keeping the first booking with that id.",
+                             event.get("seq"), booking.id)
+                continue
+            if booking.id in early_cancels:
+                early_cancels.discard(booking.id)
+                booking.status = "cancelled"
+            bookings[booking.id] = booking
+        elif kind == "cancelled":
+            booking = bookings.get(event["id"])
+            if booking is not None:
+                booking.status = "cancelled"
+            else:
+                early_cancels.add(event["id"])
+        elif kind == "cleared":
+            bookings.clear()
+            early_cancels.clear()
+    return list(bookings.values())
+
+def restore(path, store):
+    """
+    Rebuilds a BookingStore from the event log at path, replacing its contents with
+    one batched write. Returns how many bookings were restored.
+    """
+    bookings = replay(iter_events(path))
+    with store.lock:
+        store.load()
+        store.clear()
+        store.add_many(bookings)
+        store.compact()
+    return len(bookings)
+
+def _self_test_worker(directory, rounds):
+    from bookingsystem import BookingSystem
+    system = BookingSystem(os.path.join(directory, "bookings.json"), os.path.join(directory, "booking_log.txt"),
+                           journal=True, event_file=os.path.join(directory, "booking_events.jsonl"))
+    for i in range(rounds):
+        system.book("Enavroom-vroom", "PUP Main", "CEA", "Cash")
+        if i % 3 == 0: # Cancel the newest booking, often one the other process just made
+            newest = system.find_bookings(status="booked")
+            if newest:
+                system.cancel(newest[-1].id)
+    system.save()
+
+def _self_test(processes, rounds):
+    """Books and cancels from several processes into one store and event log, then checks the log."""
+    import multiprocessing
+    import tempfile
+    from storage import JsonBookingStore
+    with tempfile.TemporaryDirectory() as directory:
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=_self_test_worker, args=(directory, rounds)) for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        path = os.path.join(directory, "booking_events.jsonl")
+        seqs = [event["seq"] for event in iter_events(path)]
+        store = JsonBookingStore(os.path.join(directory, "bookings.json"))
+        store.load()
+        stored = {booking.id: booking.status for booking in store.all()}
+        replayed = {booking.id: booking.status for booking in replay(iter_events(path))}
+        store.close()
+    return {
+        "bookings": len(stored),
+        "events": len(seqs),
+        "unique_seqs": seqs == list(range(1, len(seqs) + 1)),
+        "replay_matches_store": replayed == stored,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Check the event log against a store shared by several processes.")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=300, help="bookings per process")
+    args = parser.parse_args()
+    report = _self_test(args.processes, args.rounds)
+    for key, value in report.items():
+        print(f"{key:>20}: {value}")
+    raise SystemExit(0 if report["unique_seqs"] and report["replay_matches_store"] else 1)
@@ -2,8 +2,19 @@ from tkinter import Tk
 import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk, ImageDraw, ImageFont
+import logging
 import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
 from bookingsystem import Booking, BookingSystem, get_distance, LOCATIONS, DISTANCE_MATRIX, ROUTE_IMAGE_MAP 
+from booking_service import BookingService, BookingError
+from server import BookingClient
+import instrumentation
+from imagecache import PhotoImageLRU, thumbnail_cache
+from dispatch import DriverPool, MatchingEngine
+
+logger = logging.getLogger(__name__)
 
 PURPLE_DARK = "#360042"
 HIGHLIGHT_COLOR = "#6A0DAD"
@@ -21,31 +32,60 @@ FONT_BUTTON = ("Arial", 10, "bold")
 FONT_HEADER = ("Arial", 18, "bold") # For page titles
 FONT_BODY = ("Arial", 10)
 
-_image_references = {}
+IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024 # Decoded pixels kept for reuse across pages
+_image_references = PhotoImageLRU(IMAGE_CACHE_MAX_BYTES)
+
+DRIVERS_PER_VEHICLE_TYPE = 5 # Size of the demo fleet the app dispatches from
+DRIVER_SEARCH_RETRY_MS = 1000 # How often to look again when every driver is busy
+DEMO_MS_PER_MINUTE = 1000 # A driver's ETA plays out at one second per minute
 
 
 IMAGE_BASE_PATH = os.path.join(os.path.expanduser('~'), 'enavroom_assets')
 
+def _image_key(filename, size, is_circular):
+    filepath = os.path.join(IMAGE_BASE_PATH, filename)
+    return f"{filepath}_{size[0]}x{size[1]}_{is_circular}" if size else f"{filepath}_{is_circular}"
+
 def load_image(filename, size=None, is_circular=False, fill_color=(200, 200, 200)):
     """
     Loads an image, optionally resizes it, and can make it circular.
-    Uses a global dictionary to keep references.
+    Uses a global size-bounded LRU cache to reuse images; callers must still keep a
+    reference on the widget (widget.image = img) since the cache may evict it.
     Provides a placeholder if the image is not found or fails to load.
     """
-    filepath = os.path.join(IMAGE_BASE_PATH, filename)
-    img_key = f"{filepath}_{size[0]}x{size[1]}_{is_circular}" if size else f"{filepath}_{is_circular}"
+    img_key = _image_key(filename, size, is_circular)
+    photo = _image_references.get(img_key)
+    if photo:
+        instrumentation.count("images.memory_hit")
+        return photo
 
-    if img_key in _image_references:
-        return _image_references[img_key]
+    instrumentation.count("images.memory_miss")
+    with instrumentation.timer("images.load"):
+        pil_img = load_pil_image(filename, size, is_circular, fill_color)
+    if pil_img:
+        photo = ImageTk.PhotoImage(pil_img)
+        _image_references.put(img_key, photo)
+        return photo
+    return None # Should not happen if placeholder is created
 
+def load_pil_image(filename, size=None, is_circular=False, fill_color=(200, 200, 200)):
+    """
+    Decodes, scales and masks an image without touching Tk.
+    Scaled images come from the on-disk thumbnail cache when the source is unchanged.
+    """
+    filepath = os.path.join(IMAGE_BASE_PATH, filename)
     pil_img = None
     try:
         if os.path.exists(filepath):
+            if size:
+                pil_img = thumbnail_cache.get(filepath, size, is_circular)
+                if pil_img:
+                    return pil_img
             pil_img = Image.open(filepath)
             if size:
                 pil_img = pil_img.resize(size, Image.LANCZOS)
         else:
-            print(f"DEBUG: Image file not found: {filepath}. Creating placeholder.")
+            logger.debug("Image file not found: %s. Creating placeholder.", filepath)
             raise FileNotFoundError # Trigger fallback to placeholder creation
 
         if is_circular:
@@ -58,6 +98,9 @@ def load_image(filename, size=None, is_circular=False, fill_color=(200, 200, 200
                 pil_img = pil_img.convert('RGBA')
             pil_img.putalpha(mask)
 
+        if size:
+            thumbnail_cache.put(filepath, size, is_circular, pil_img)
+
     except (FileNotFoundError, Exception) as e:
         # print(f"ERROR: Could not load or process image {filepath}: {e}. Creating fallback placeholder.")
         if size is None: size = (50, 50) # Default size for placeholder if not provided
@@ -81,16 +124,97 @@ def load_image(filename, size=None, is_circular=False, fill_color=(200, 200, 200
         y = (size[1] - text_height) / 2
         d.text((x, y), text, fill=(0,0,0), font=font)
 
-    if pil_img:
-        photo = ImageTk.PhotoImage(pil_img)
-        _image_references[img_key] = photo
-        return photo
-    return None # Should not happen if placeholder is created
+    return pil_img
+
+class AsyncImageLoader:
+    """
+    Decodes and scales images on a worker pool so the Tk main loop never blocks on PIL.
+    Tk objects may only be touched from the main thread, so workers hand finished PIL
+    images back through a queue that the main loop polls with after(); the PhotoImage
+    is created there, stored in the shared cache, and passed to each waiting callback.
+    """
+    POLL_INTERVAL_MS = 30
+
+    def __init__(self, root, workers=4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-loader")
+        self.results = queue.Queue()
+        self.pending = {} # image key -> callbacks waiting for it
+        self.polling = False
+
+    def request(self, filename, size=None, is_circular=False, callback=None):
+        """
+        Returns the image right away if it is cached (also calling callback), otherwise
+        returns None and calls callback(photo) on the main thread once it is decoded.
+        """
+        img_key = _image_key(filename, size, is_circular)
+        photo = _image_references.get(img_key)
+        if photo:
+            if callback:
+                callback(photo)
+            return photo
+        callbacks = self.pending.get(img_key)
+        if callbacks is None:
+            callbacks = self.pending[img_key] = []
+            self.executor.submit(self._decode, img_key, filename, size, is_circular)
+        if callback:
+            callbacks.append(callback)
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        return None
+
+    def prefetch(self, filename, size=None, is_circular=False):
+        """Starts decoding an image that is likely to be shown soon."""
+        self.request(filename, size, is_circular)
+
+    def _decode(self, img_key, filename, size, is_circular):
+        # Runs on a worker thread: PIL only, no Tk calls
+        try:
+            pil_img = load_pil_image(filename, size, is_circular)
+        except Exception as e:
+            logger.error("Background load of %s failed: %s", filename, e)
+            pil_img = None
+        self.results.put((img_key, filename, size, is_circular, pil_img))
+
+    def _poll(self):
+        while True:
+            try:
+                img_key, filename, size, is_circular, pil_img = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if pil_img is not None:
+                photo = ImageTk.PhotoImage(pil_img)
+                _image_references.put(img_key, photo)
+            else:
+                photo = load_image(filename, size, is_circular) # Placeholder path, on the main thread
+            for callback in self.pending.pop(img_key, []):
+                callback(photo)
+        if self.pending:
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        else:
+            self.polling = False
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 # --- Main Application Class ---
 
 class App(tk.Tk):
-    def __init__(self):
+    # Pages worth building in idle time once the given page is on screen
+    LIKELY_NEXT_PAGES = {
+        "StartPage": ["HomePage"],
+        "HomePage": ["PUandDOPage", "HistoryPage", "MessagePage"],
+        "MessagePage": ["NotificationPage"],
+        "PUandDOPage": ["MapPage"],
+        "MapPage": ["LoadingPage"],
+        "LoadingPage": ["WeFoundDriverEnacarPage", "WeFoundDriverEnavroomPage"],
+        "WeFoundDriverEnacarPage": ["DonePage"],
+        "WeFoundDriverEnavroomPage": ["DonePage"],
+    }
+
+    def __init__(self, warm_up_pages=True):
+        self.launch_started = time.perf_counter()
         super().__init__()
         self.title("Enavroom App")
         self.geometry("375x667") # Typical mobile app size
@@ -98,8 +222,14 @@ class App(tk.Tk):
         self.configure(bg=PURPLE_DARK)
 
         self.frames = {}
-        self.booking_system = BookingSystem("bookings.json")  # Initialize booking system with file
+        self.image_loader = AsyncImageLoader(self)
+        self.booking_system = BookingSystem("bookings.json", journal=True)  # Journaled so each booking is a single append
         self.booking_system.load() # Load existing bookings from file
+        # Validation and booking flow shared with the CLI; with ENAVROOM_SERVICE_URL set, the
+        # app books through a running booking server (python main.py serve) instead
+        service_url = os.environ.get("ENAVROOM_SERVICE_URL")
+        self.booking_service = BookingClient.from_url(service_url) if service_url else BookingService(self.booking_system)
+        self.dispatcher = MatchingEngine(DriverPool.generate(DRIVERS_PER_VEHICLE_TYPE))
 
         
         # State variables to pass data between pages
@@ -110,33 +240,78 @@ class App(tk.Tk):
             "distance": 0,
             "cost": 0,
             "payment_method": "Cash",
-            "booking_id": None
+            "booking_id": None,
+            "driver_assignment": None
         }
 
         # Create container frame for all pages
-        container = tk.Frame(self, bg=PURPLE_DARK)
-        container.pack(side="top", fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
+        self.container = tk.Frame(self, bg=PURPLE_DARK)
+        self.container.pack(side="top", fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
 
-        # Initialize all pages and store them in self.frames
+        # Register page factories; each page is built the first time it is needed
+        self.page_factories = {}
         for F in (StartPage, HomePage, MessagePage, NotificationPage, HistoryPage, PUandDOPage, MapPage,
                   LoadingPage, WeFoundDriverEnacarPage, WeFoundDriverEnavroomPage, DonePage):
-            page_name = F.__name__
-            frame = F(parent=container, controller=self)
+            self.page_factories[F.__name__] = F
+        self.page_build_times = {} # page name -> seconds spent in its constructor
+        self.warm_up_pages = warm_up_pages
+        self.warm_up_queue = []
+
+        self.show_frame("StartPage") # Start with the StartPage
+        self.after_idle(self.report_startup_timings) # Runs once the first screen has been drawn
+
+    def get_frame(self, page_name):
+        """Returns the page, building it on first use."""
+        frame = self.frames.get(page_name)
+        if frame is None:
+            started = time.perf_counter()
+            frame = self.page_factories[page_name](parent=self.container, controller=self)
             self.frames[page_name] = frame
             frame.grid(row=0, column=0, sticky="nsew")
+            frame.lower() # A page built ahead of time must not cover the one on screen
+            self.page_build_times[page_name] = time.perf_counter() - started
+            if instrumentation.is_enabled():
+                instrumentation.record("page.build." + page_name, self.page_build_times[page_name])
+        return frame
 
-        self.show_frame("StartPage") # Start with the StartPage
+    def _schedule_warm_up(self, page_name):
+        if not self.warm_up_pages:
+            return
+        for next_page in self.LIKELY_NEXT_PAGES.get(page_name, []):
+            if next_page not in self.frames and next_page not in self.warm_up_queue:
+                self.warm_up_queue.append(next_page)
+        if self.warm_up_queue:
+            self.after_idle(self._warm_up_next_page)
+
+    def _warm_up_next_page(self):
+        # One page per idle callback, so input events still get handled in between
+        if self.warm_up_queue:
+            self.get_frame(self.warm_up_queue.pop(0))
+        if self.warm_up_queue:
+            self.after(10, self._warm_up_next_page)
+
+    def report_startup_timings(self):
+        """Logs how long cold launch took and what each page cost to build so far."""
+        startup_seconds = time.perf_counter() - self.launch_started
+        if instrumentation.is_enabled():
+            instrumentation.record("app.startup", startup_seconds)
+        logger.info("Interactive after %.1f ms", startup_seconds * 1000)
+        for page_name, seconds in self.page_build_times.items():
+            logger.info("  built %s in %.1f ms", page_name, seconds * 1000)
 
     def show_frame(self, page_name):
         """Shows a frame for the given page name and updates its content if needed."""
-        frame = self.frames[page_name]
+        frame = self.get_frame(page_name)
         # Call an update method on the frame if it exists and is needed
         if hasattr(frame, 'on_show'):
-            frame.on_show()
+            with instrumentation.timer("page.on_show." + page_name):
+                frame.on_show()
         frame.tkraise()
-        print(f"DEBUG: Showing frame: {page_name}")
+        instrumentation.count("page.shown." + page_name)
+        logger.debug("Showing frame: %s", page_name)
+        self._schedule_warm_up(page_name)
 
     def exit_app(self):
         """Prompts user and exits the application."""
@@ -144,10 +319,14 @@ class App(tk.Tk):
             self.booking_system.save()
             self.destroy()
 
+    def destroy(self):
+        self.image_loader.shutdown()
+        super().destroy()
+
     def update_booking_details(self, **kwargs):
         """Updates the current booking details dictionary."""
         self.current_booking_details.update(kwargs)
-        print(f"DEBUG: Booking details updated: {self.current_booking_details}")
+        logger.debug("Booking details updated: %s", self.current_booking_details)
 
 # --- Common Helper for Binding Widgets Recursively ---
 def bind_widgets_recursively(widget, func):
@@ -355,6 +534,9 @@ class NotificationPage(tk.Frame):
         tk.Label(header_frame, text=title, font=FONT_HEADER, bg=PURPLE_DARK, fg=WHITE).pack(expand=True)
 
 class HistoryPage(tk.Frame):
+    ROW_HEIGHT = 118  # Fixed so a row's position is index * ROW_HEIGHT
+    PAGE_SIZE = 50
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -367,26 +549,28 @@ class HistoryPage(tk.Frame):
         scroll_container.pack(fill="both", expand=True, padx=20, pady=(20, 0))
 
         # Create Canvas and Scrollbar
-        self.canvas = tk.Canvas(scroll_container, bg=WHITE, bd=1, relief="solid", highlightthickness=0)
+        self.canvas = tk.Canvas(scroll_container, bg=WHITE, bd=1, relief="solid", highlightthickness=0, yscrollincrement=20)
         self.scrollbar = tk.Scrollbar(scroll_container, orient="vertical", command=self.canvas.yview)
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self._on_canvas_scrolled)
 
         # Pack scrollbar to the right
         self.scrollbar.pack(side="right", fill="y")
         # Pack canvas to fill the remaining space
         self.canvas.pack(side="left", fill="both", expand=True)
 
-        # Create a frame inside the canvas to hold the history list
-        self.history_list_frame = tk.Frame(self.canvas, bg=WHITE)
-        # Store the canvas window ID to modify its width later
-        self.history_frame_id = self.canvas.create_window((0, 0), window=self.history_list_frame, anchor="nw")
+        # The list is virtualized: the scrollregion is sized for every booking, but only
+        # the rows inside the viewport exist as widgets. Rows are recycled on scroll and
+        # bookings are fetched from the store a page at a time.
+        self.row_pool = []  # Each entry: {"window": canvas item, "frame", "labels", "index"}
+        self.page_cache = {}  # page number -> list of Booking
+        self.total_bookings = 0
+        self.render_pending = False
+        self.empty_label = tk.Label(self.canvas, text="No past bookings yet.", font=FONT_NORMAL, bg=WHITE, fg=TEXT_COLOR)
+        self.empty_label_id = self.canvas.create_window((0, 20), window=self.empty_label, anchor="n", state="hidden")
+
+        # Keep rows as wide as the canvas and fill any newly exposed space
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
 
-        # Configure canvas scrolling and responsive width
-        self.history_list_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        
-        # Add this binding to make the history frame fill the canvas width
-        self.canvas.bind("<Configure>", lambda e: self.canvas.itemconfig(self.history_frame_id, width=e.width))
-        
         self.canvas.bind("<MouseWheel>", self._on_mousewheel)
 
         # "Clear History" button below the scrollable area
@@ -402,6 +586,22 @@ class HistoryPage(tk.Frame):
         """Handle mouse wheel scrolling for the canvas."""
         self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
+    def _on_canvas_scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_render()
+
+    def _on_canvas_configure(self, event):
+        for row in self.row_pool:
+            self.canvas.itemconfig(row["window"], width=event.width)
+        self.canvas.coords(self.empty_label_id, event.width / 2, 20)
+        self._schedule_render()
+
+    def _schedule_render(self):
+        # Coalesce bursts of scroll events into one render per idle cycle
+        if not self.render_pending:
+            self.render_pending = True
+            self.after_idle(self._render_visible_rows)
+
     def clear_history(self):
         if messagebox.askyesno("Clear All History", "Are you sure you want to delete all booking history?"):
             self.controller.booking_system.clear_all()
@@ -425,38 +625,97 @@ class HistoryPage(tk.Frame):
 
     def on_show(self):
         """Called when the frame is shown."""
-        self.controller.booking_system.load()  # Ensure bookings are loaded
-        self.update_history_display()
+        booking_system = self.controller.booking_system
+        booking_system.load()  # Only picks up what changed on disk since the last load
+        if booking_system.generation != self.displayed_generation:
+            self.update_history_display()
 
     def update_history_display(self):
-        # Clear previous history entries
-        for widget in self.history_list_frame.winfo_children():
-            widget.destroy()
-
-        bookings = self.controller.booking_system.bookings
-        if not bookings:    
-            tk.Label(self.history_list_frame, text="No past bookings yet.", font=FONT_NORMAL, bg=WHITE, fg=TEXT_COLOR).pack(pady=20)
-            return
+        """Resizes the list for the current history and redraws the visible rows."""
+        booking_system = self.controller.booking_system
+        self.displayed_generation = booking_system.generation
+        self.page_cache = {}
+        self.total_bookings = booking_system.count_bookings()
+        for row in self.row_pool:
+            row["index"] = None  # Force every row to be refilled
+
+        self.canvas.itemconfig(self.empty_label_id, state="normal" if self.total_bookings == 0 else "hidden")
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), max(1, self.total_bookings * self.ROW_HEIGHT)))
+        self._schedule_render()
+
+    def _get_booking(self, index):
+        page_number = index // self.PAGE_SIZE
+        page = self.page_cache.get(page_number)
+        if page is None:
+            if len(self.page_cache) >= 8:  # Only pages around the viewport stay cached
+                self.page_cache = {}
+            page = self.controller.booking_system.find_bookings(limit=self.PAGE_SIZE, offset=page_number * self.PAGE_SIZE)
+            self.page_cache[page_number] = page
+        offset = index % self.PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def _create_row(self):
+        frame = tk.Frame(self.canvas, bg=WHITE, height=self.ROW_HEIGHT)
+        frame.pack_propagate(False)
+        booking_frame = tk.Frame(frame, bd=1, relief="groove")
+        booking_frame.pack(fill="x", padx=5, pady=2)
+        labels = []
+        for font in (FONT_SUBTITLE,) + (FONT_NORMAL,) * 6:
+            label = tk.Label(booking_frame, font=font, fg=TEXT_COLOR, anchor="w")
+            label.pack(fill="x")
+            labels.append(label)
+        ttk.Separator(frame, orient="horizontal").pack(fill="x", padx=5, pady=5)
+        for widget in [frame, booking_frame] + labels:
+            widget.bind("<MouseWheel>", self._on_mousewheel)
+        window = self.canvas.create_window((0, 0), window=frame, anchor="nw",
+                                           width=self.canvas.winfo_width(), height=self.ROW_HEIGHT)
+        row = {"window": window, "frame": frame, "booking_frame": booking_frame, "labels": labels, "index": None}
+        self.row_pool.append(row)
+        return row
+
+    def _fill_row(self, row, booking):
+        # Determine action based on status
+        action = "CANCELLED" if booking.status == "cancelled" else "BOOKED"
+        bg_color = "#eb868f" if booking.status == "cancelled" else "#6ce989"
+        texts = (
+            f"Action: {action}",
+            f"Booking ID: {booking.id}",
+            f"Vehicle: {booking.vehicle_type}",
+            f"Route: {' to '.join(booking.route())}",
+            f"Distance: {booking.distance:.1f} km",
+            f"Cost: ₱{booking.cost:.2f} ({booking.payment_method})",
+            f"Status: {booking.status}",
+        )
+        row["booking_frame"].config(bg=bg_color)
+        for label, text in zip(row["labels"], texts):
+            label.config(text=text, bg=bg_color)
+
+    def _render_visible_rows(self):
+        self.render_pending = False
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.ROW_HEIGHT)
+        first = max(0, int(top // self.ROW_HEIGHT))
+        last = min(self.total_bookings, int((top + height) // self.ROW_HEIGHT) + 1)
+        visible = range(first, last)
+
+        # Rows already showing a visible index stay put; the rest are recycled
+        free_rows = [row for row in self.row_pool if row["index"] not in visible]
+        shown = {row["index"] for row in self.row_pool if row["index"] in visible}
+        for index in visible:
+            if index in shown:
+                continue
+            booking = self._get_booking(index)
+            if booking is None:
+                continue
+            row = free_rows.pop() if free_rows else self._create_row()
+            self._fill_row(row, booking)
+            row["index"] = index
+            self.canvas.coords(row["window"], 0, index * self.ROW_HEIGHT)
+            self.canvas.itemconfig(row["window"], state="normal")
+        for row in free_rows:
+            row["index"] = None
+            self.canvas.itemconfig(row["window"], state="hidden")
 
-        for i, booking in enumerate(bookings):
-            # Determine action based on status
-            action = "CANCELLED" if booking.status == "cancelled" else "BOOKED"
-            bg_color = "#eb868f" if booking.status == "cancelled" else "#6ce989"
-
-            booking_frame = tk.Frame(self.history_list_frame, bg=bg_color, bd=1, relief="groove")
-            booking_frame.pack(fill="x", padx=5, pady=2)
-
-            tk.Label(booking_frame, text=f"Action: {action}", font=FONT_SUBTITLE, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-            tk.Label(booking_frame, text=f"Booking ID: {booking.id}", font=FONT_NORMAL, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-            tk.Label(booking_frame, text=f"Vehicle: {booking.vehicle_type}", font=FONT_NORMAL, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-            tk.Label(booking_frame, text=f"Route: {booking.start} to {booking.end}", font=FONT_NORMAL, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-            tk.Label(booking_frame, text=f"Distance: {booking.distance:.1f} km", font=FONT_NORMAL, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-            tk.Label(booking_frame, text=f"Cost: ₱{booking.cost:.2f} ({booking.payment_method})", font=FONT_NORMAL, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-            tk.Label(booking_frame, text=f"Status: {booking.status}", font=FONT_NORMAL, bg=bg_color, fg=TEXT_COLOR, anchor="w").pack(fill="x")
-
-            if i < len(bookings) - 1:
-                ttk.Separator(self.history_list_frame, orient="horizontal").pack(fill="x", padx=5, pady=5)
-                                                           
 class PUandDOPage(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -467,6 +726,7 @@ class PUandDOPage(tk.Frame):
         self.dropoff_location_var = tk.StringVar(self)
         self.estimated_distance_var = tk.StringVar(self, value="0.0 km")
         self.estimated_cost_var = tk.StringVar(self, value="₱0.00")
+        self.prefetched_pickup = None
 
         self.pickup_location_var.trace_add("write", self._update_details)
         self.dropoff_location_var.trace_add("write", self._update_details)
@@ -518,14 +778,26 @@ class PUandDOPage(tk.Frame):
             tk.Button(header_frame, text="<", command=back_command, bd=0, bg=header_frame.cget("bg"), fg=WHITE, font=("Arial", 14)).place(x=10, y=10)
         tk.Label(header_frame, text=title, font=FONT_HEADER, bg=PURPLE_DARK, fg=WHITE).pack(expand=True)
 
+    def _prefetch_route_maps(self, pickup):
+        """Starts decoding every map that can follow this pick-up, so MapPage never waits."""
+        if pickup == self.prefetched_pickup:
+            return
+        self.prefetched_pickup = pickup
+        for dropoff in LOCATIONS:
+            map_filename = ROUTE_IMAGE_MAP.get((pickup, dropoff))
+            if map_filename:
+                self.controller.image_loader.prefetch(map_filename, (375, 160))
+
     def _update_details(self, *args):
         pickup = self.pickup_location_var.get()
         dropoff = self.dropoff_location_var.get()
+        if pickup:
+            self._prefetch_route_maps(pickup)
         vehicle_type = self.controller.current_booking_details.get("vehicle_type", "Enavroom-vroom")  # Default to Moto Taxi if not set
 
         if pickup and dropoff and pickup != dropoff:
             distance = get_distance(pickup, dropoff)
-            cost = self.controller.booking_system.calculate_cost(vehicle_type, distance)
+            cost = self.controller.booking_system.quote_fare(pickup, dropoff, vehicle_type)
             self.estimated_distance_var.set(f"{distance:.1f} km")
             self.estimated_cost_var.set(f"₱{cost:.2f}")
         else:
@@ -535,26 +807,19 @@ class PUandDOPage(tk.Frame):
     def _on_confirm_ride(self):
         pickup = self.pickup_location_var.get()
         dropoff = self.dropoff_location_var.get()
+        vehicle_type = self.controller.current_booking_details.get("vehicle_type") or "Enavroom-vroom"
 
-        if not pickup or not dropoff:
-            messagebox.showerror("Error", "Please select both pick-up and drop-off locations.")
-            return
-        if pickup == dropoff:
-            messagebox.showerror("Error", "Pick-up and drop-off locations cannot be the same.")
-            return
-        
-        distance = get_distance(pickup, dropoff)
-        if distance == 0.0:
-            messagebox.showerror("Error", f"No route defined between {pickup} and {dropoff}. Please select different locations.")
+        try:
+            quote = self.controller.booking_service.quote(pickup, dropoff, vehicle_type)
+        except BookingError as e:
+            messagebox.showerror("Error", str(e))
             return
 
-        vehicle_type = self.controller.current_booking_details.get("vehicle_type", "Enavroom-vroom")
-        cost = self.controller.booking_system.calculate_cost(vehicle_type, distance)
         self.controller.update_booking_details(
             pickup_location=pickup,
             dropoff_location=dropoff,
-            distance=distance,
-            cost=cost
+            distance=quote["distance"],
+            cost=quote["cost"]
         )
         self.controller.show_frame("MapPage")
 
@@ -565,6 +830,12 @@ class MapPage(tk.Frame):
     # Define constants at class level
     CENTER_PADX_VEHICLE = 60
     CENTER_PADX_PAYMENT_BOOK = 30
+    # Every option card is built once; on_show only decides which ones are packed
+    VEHICLE_CONFIGS = [
+        {"type": "Enavroom-vroom", "icon": "enavroom.png", "title": "Enavroom-vroom", "passengers": "1", "description": "Beat the traffic on a motorcycle ride."},
+        {"type": "Car (4-seater)", "icon": "car.png", "title": "Car (4-seater)", "passengers": "4", "description": "Get around town affordably, up to 4 passengers."},
+        {"type": "Car (6-seater)", "icon": "car.png", "title": "Car (6-seater)", "passengers": "6", "description": "Roomy and affordable rides for up to six."},
+    ]
 
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -574,6 +845,7 @@ class MapPage(tk.Frame):
         self.current_selected_vehicle_frame = None
         self.selected_vehicle_type = tk.StringVar(value="")
         self.selected_payment_method = tk.StringVar(value="Cash")
+        self.map_filename = None # Route map currently requested for self.map_label
 
         # Retrieve booking details from controller
         self.pickup_location_display = self.controller.current_booking_details.get("pickup_location", "PUP Main")
@@ -587,70 +859,26 @@ class MapPage(tk.Frame):
         map_header_frame = tk.Frame(self, bg=PURPLE_DARK, height=50)
         map_header_frame.pack(fill="x", pady=(0, 0))
 
-# --- Dynamic Map Image Logic ---
-        map_filename = ROUTE_IMAGE_MAP.get((self.pickup_location_display, self.dropoff_location_display))
-        if not map_filename:
-            map_filename = ROUTE_IMAGE_MAP.get((self.dropoff_location_display, self.pickup_location_display))
-        
-        if map_filename:
-            map_img = load_image(map_filename, (375, 160))
-            if map_img:
-                map_label = tk.Label(self, image=map_img, bg=GRAY_LIGHT)
-                map_label.image = map_img
-                map_label.pack(fill="x", pady=(0, 0))
-            else:
-                map_placeholder_label = tk.Label(self, text=f"Map Not Found\n(Tried: {map_filename})",
-                                                font=("Arial", 12), bg="lightgray", fg="darkgray", height=8, wraplength=250)
-                map_placeholder_label.pack(fill="x", expand=False, pady=(0, 0))
-        else:
-            map_placeholder_label = tk.Label(self, text=f"Map Not Found\n(Route: {self.pickup_location_display} to {self.dropoff_location_display})",
-                                            font=("Arial", 12), bg="lightgray", fg="darkgray", height=8, wraplength=250)
-            map_placeholder_label.pack(fill="x", expand=False, pady=(0, 0))
-            
+        self.map_label = tk.Label(self, font=("Arial", 12), bg="lightgray", fg="darkgray", height=8, wraplength=250)
+        self.map_label.pack(fill="x", pady=(0, 0))
+
         self.scrollable_frame = tk.Frame(self, bg=GRAY_LIGHT)
         self.scrollable_frame.pack(fill="both", expand=True)
 
         tk.Label(self.scrollable_frame, text="Choose your Enavroom", font=FONT_TITLE, bg=GRAY_LIGHT, fg=TEXT_COLOR).pack(pady=(10, 10))
 
-        self.vehicle_option_frames = []
-
-        # Define vehicle options based on initial vehicle type from HomePage
-        vehicle_configs = []
-        if self.initial_vehicle_type == "Enavroom-vroom":
-            vehicle_configs = [ 
-                {"type": "Enavroom-vroom", "icon": "enavroom.png", "title": "Enavroom-vroom", "passengers": "1", "description": "Beat the traffic on a motorcycle ride."}
-            ]
-        elif "Car" in self.initial_vehicle_type:
-            vehicle_configs = [
-                {"type": "Car (4-seater)", "icon": "enacar.png", "title": "Car (4-seater)", "passengers": "4", "description": "Get around town affordably, up to 4 passengers."},
-                {"type": "Car (6-seater)", "icon": "enacar.png", "title": "Car (6-seater)", "passengers": "6", "description": "Roomy and affordable rides for up to six."}
-            ]
-
-        for config in vehicle_configs:
-            calculated_price = self.controller.booking_system.calculate_cost(config["type"], self.trip_distance)
-            option_data = {
-                "icon": config["icon"],
-                "title": config["title"],
-                "passengers": config["passengers"],
-                "description": config["description"],
-                "price": f"{calculated_price:.2f}"
-            }
-            frame = self.create_service_option(self.scrollable_frame, **option_data)
-            frame.pack(fill="x", padx=self.CENTER_PADX_VEHICLE, pady=5)
+        self.vehicle_option_frames = [] # (frame, vehicle type) for every option card
+        for config in self.VEHICLE_CONFIGS:
+            frame = self.create_service_option(self.scrollable_frame, config["icon"], config["title"],
+                                               config["passengers"], config["description"], "0.00")
             self.vehicle_option_frames.append((frame, config["type"]))
             bind_widgets_recursively(frame, lambda e, f=frame, t=config["type"]: self.select_vehicle_option(f, t))
 
-        # Pre-select the vehicle type from HomePage
-        for frame, vehicle_type_name in self.vehicle_option_frames:
-            if vehicle_type_name == self.initial_vehicle_type:
-                self.select_vehicle_option(frame, vehicle_type_name)
-                break
-
-        payment_frame = tk.Frame(self.scrollable_frame, bg=WHITE, bd=1, relief="solid", padx=10, pady=5)
-        payment_frame.pack(fill="x", padx=self.CENTER_PADX_PAYMENT_BOOK, pady=(10, 10))
+        self.payment_frame = tk.Frame(self.scrollable_frame, bg=WHITE, bd=1, relief="solid", padx=10, pady=5)
+        self.payment_frame.pack(fill="x", padx=self.CENTER_PADX_PAYMENT_BOOK, pady=(10, 10))
 
         cash_img = load_image("cash_2.png", (30, 30))
-        cash_button_frame = tk.Frame(payment_frame, bg=WHITE)
+        cash_button_frame = tk.Frame(self.payment_frame, bg=WHITE)
         cash_button_frame.pack(side="left", expand=True, padx=10)
         if cash_img:
             cash_icon_label = tk.Label(cash_button_frame, image=cash_img, bg=WHITE)
@@ -662,7 +890,7 @@ class MapPage(tk.Frame):
         bind_widgets_recursively(cash_button_frame, lambda e: self.select_payment_method("Cash"))
 
         wallet_img = load_image("wallet_2.png", (30, 30))
-        wallet_button_frame = tk.Frame(payment_frame, bg=WHITE)
+        wallet_button_frame = tk.Frame(self.payment_frame, bg=WHITE)
         wallet_button_frame.pack(side="left", expand=True, padx=10)
         if wallet_img:
             wallet_icon_label = tk.Label(wallet_button_frame, image=wallet_img, bg=WHITE)
@@ -678,6 +906,8 @@ class MapPage(tk.Frame):
                                     padx=20, pady=10, relief="raised", bd=0, cursor="hand2")
         book_now_button.pack(fill="x", padx=self.CENTER_PADX_PAYMENT_BOOK, pady=(10, 10))
 
+        self._refresh() # No-op at startup, when no route has been picked yet
+
     def _create_header(self, title, back_command):
         header_frame = tk.Frame(self, bg=PURPLE_DARK, height=50)
         header_frame.pack(fill="x", pady=(0, 0))
@@ -689,7 +919,70 @@ class MapPage(tk.Frame):
             back_button.place(x=10, y=10)
         else:
             tk.Button(header_frame, text="<", command=back_command, bd=0, bg=header_frame.cget("bg"), fg=WHITE, font=("Arial", 14)).place(x=10, y=10)
-        tk.Label(header_frame, text=title, font=FONT_HEADER, bg=PURPLE_DARK, fg=WHITE).pack(expand=True)
+        self.title_label = tk.Label(header_frame, text=title, font=FONT_HEADER, bg=PURPLE_DARK, fg=WHITE)
+        self.title_label.pack(expand=True)
+
+    def _update_map(self):
+        """Points the map label at the current route. Shows a placeholder until the background loader delivers it."""
+        map_filename = ROUTE_IMAGE_MAP.get((self.pickup_location_display, self.dropoff_location_display))
+        if not map_filename:
+            map_filename = ROUTE_IMAGE_MAP.get((self.dropoff_location_display, self.pickup_location_display))
+        if map_filename == self.map_filename:
+            return # Same route as last time; the label already shows (or is waiting for) it
+        self.map_filename = map_filename
+
+        if not map_filename:
+            logger.warning("No map filename found for route: %s to %s", self.pickup_location_display, self.dropoff_location_display)
+            self.map_label.config(image="", height=8, bg="lightgray",
+                                  text=f"Map Not Found\n(Route: {self.pickup_location_display} to {self.dropoff_location_display})")
+            self.map_label.image = None
+            return
+
+        self.map_label.config(image="", height=8, bg="lightgray", text="Loading map...")
+        self.map_label.image = None
+
+        def show_map(map_img):
+            # The user may have picked another route while this map was decoding
+            if map_filename == self.map_filename:
+                self.map_label.config(image=map_img, text="", height=0, bg=GRAY_LIGHT)
+                self.map_label.image = map_img
+
+        self.controller.image_loader.request(map_filename, (375, 160), callback=show_map)
+
+    def _refresh(self):
+        """Updates the existing widgets in place for the current route and vehicle type."""
+        if not (self.pickup_location_display and self.dropoff_location_display):
+            return # Built before a route was picked; on_show fills the page in
+        self.title_label.config(text=f"{self.pickup_location_display} → {self.dropoff_location_display}")
+        self._update_map()
+
+        # Moto taxi bookings only offer the moto option; car bookings offer both car sizes
+        if self.initial_vehicle_type == "Enavroom-vroom":
+            offered = ["Enavroom-vroom"]
+        elif "Car" in self.initial_vehicle_type:
+            offered = ["Car (4-seater)", "Car (6-seater)"]
+        else:
+            offered = []
+
+        for frame, vehicle_type_name in self.vehicle_option_frames:
+            frame.pack_forget()
+        for frame, vehicle_type_name in self.vehicle_option_frames:
+            if vehicle_type_name in offered:
+                calculated_price = self.controller.booking_system.quote_fare(
+                    self.pickup_location_display, self.dropoff_location_display, vehicle_type_name)
+                frame.price_label.config(text=f"₱{calculated_price:.2f}")
+                frame.pack(fill="x", padx=self.CENTER_PADX_VEHICLE, pady=5, before=self.payment_frame)
+
+        # Pre-select the vehicle type from HomePage
+        self.selected_vehicle_type.set("")
+        for frame, vehicle_type_name in self.vehicle_option_frames:
+            if vehicle_type_name == self.initial_vehicle_type:
+                self.select_vehicle_option(frame, vehicle_type_name)
+                break
+        else:
+            if self.current_selected_vehicle_frame:
+                self.current_selected_vehicle_frame.config(highlightbackground="light grey", highlightthickness=1)
+            self.current_selected_vehicle_frame = None
 
     def create_service_option(self, parent, icon, title, passengers, description, price):
         frame = tk.Frame(parent, bg=WHITE, bd=1, relief="solid",
@@ -714,7 +1007,8 @@ class MapPage(tk.Frame):
         tk.Label(text_frame, text=f"• {passengers} passengers", font=FONT_NORMAL, bg=WHITE, fg="gray", anchor="w").pack(fill="x", expand=True)
         tk.Label(text_frame, text=description, font=FONT_NORMAL, bg=WHITE, fg="gray", anchor="w", wraplength=170, justify="left").pack(fill="x", expand=True)
 
-        tk.Label(frame, text=f"₱{price}", font=FONT_PRICE, bg=WHITE, fg=PURPLE_DARK).grid(row=0, column=2, padx=(8, 0), sticky="ne")
+        frame.price_label = tk.Label(frame, text=f"₱{price}", font=FONT_PRICE, bg=WHITE, fg=PURPLE_DARK)
+        frame.price_label.grid(row=0, column=2, padx=(8, 0), sticky="ne")
 
         frame.grid_columnconfigure(1, weight=1)
         return frame
@@ -725,11 +1019,11 @@ class MapPage(tk.Frame):
         selected_frame.config(highlightbackground=HIGHLIGHT_COLOR, highlightthickness=2)
         self.current_selected_vehicle_frame = selected_frame
         self.selected_vehicle_type.set(vehicle_type_name)
-        print(f"Selected vehicle: {vehicle_type_name}")
+        logger.debug("Selected vehicle: %s", vehicle_type_name)
 
     def select_payment_method(self, method):
         self.selected_payment_method.set(method)
-        print(f"Selected payment method: {method}")
+        logger.debug("Selected payment method: %s", method)
 
     def on_book_now(self):
         selected_vehicle_type = self.selected_vehicle_type.get()
@@ -739,23 +1033,23 @@ class MapPage(tk.Frame):
             messagebox.showwarning("Selection Missing", "Please select a vehicle type before booking.")
             return
 
-        final_cost = self.controller.booking_system.calculate_cost(selected_vehicle_type, self.trip_distance)
-        booking = self.controller.booking_system.book(
-            selected_vehicle_type,
-            self.pickup_location_display,
-            self.dropoff_location_display,
-            selected_payment
-        )
-        if booking:
-            self.controller.update_booking_details(
-                vehicle_type=selected_vehicle_type,
-                cost=final_cost,
-                payment_method=selected_payment,
-                booking_id=booking.id
+        try:
+            booking = self.controller.booking_service.book(
+                selected_vehicle_type,
+                self.pickup_location_display,
+                self.dropoff_location_display,
+                selected_payment
             )
-            self.controller.show_frame("LoadingPage")
-        else:
-            messagebox.showerror("Error", "Failed to confirm booking.")
+        except BookingError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.controller.update_booking_details(
+            vehicle_type=selected_vehicle_type,
+            cost=booking.cost,
+            payment_method=selected_payment,
+            booking_id=booking.id
+        )
+        self.controller.show_frame("LoadingPage")
 
     def on_show(self):
         # Update booking details when shown
@@ -766,105 +1060,7 @@ class MapPage(tk.Frame):
         self.dropoff_location_display = dropoff
         self.trip_distance = self.controller.current_booking_details.get("distance", get_distance(pickup, dropoff))
         self.initial_vehicle_type = vehicle_type
-
-        # Recreate the header and map section
-        for widget in self.winfo_children():
-            widget.destroy()
-        self.current_selected_vehicle_frame = None
-        self._create_header(f"{self.pickup_location_display} → {self.dropoff_location_display}", lambda: self.controller.show_frame("PUandDOPage"))
-
-        map_filename = ROUTE_IMAGE_MAP.get((self.pickup_location_display, self.dropoff_location_display))
-        if not map_filename:
-            map_filename = ROUTE_IMAGE_MAP.get((self.dropoff_location_display, self.pickup_location_display))
-            print(f"DEBUG: Checking reverse route: {self.dropoff_location_display} -> {self.pickup_location_display}")
-
-        if map_filename:
-            print(f"DEBUG: Map filename found: {map_filename}")
-            map_img = load_image(map_filename, (375, 160))
-            if map_img:
-                print(f"DEBUG: Successfully loaded map image: {map_filename}")
-                map_label = tk.Label(self, image=map_img, bg=GRAY_LIGHT)
-                map_label.image = map_img
-                map_label.pack(fill="x", pady=(0, 0))
-            else:
-                print(f"DEBUG: Failed to load map image: {map_filename}")
-                map_placeholder_label = tk.Label(self, text=f"Map Not Found\n(Tried: {map_filename})",
-                                                font=("Arial", 12), bg="lightgray", fg="darkgray", height=8, wraplength=250)
-                map_placeholder_label.pack(fill="x", expand=False, pady=(0, 0))
-        else:
-            print(f"DEBUG: No map filename found for route: {self.pickup_location_display} to {self.dropoff_location_display}")
-            map_placeholder_label = tk.Label(self, text=f"Map Not Found\n(Route: {self.pickup_location_display} to {self.dropoff_location_display})",
-                                            font=("Arial", 12), bg="lightgray", fg="darkgray", height=8, wraplength=250)
-            map_placeholder_label.pack(fill="x", expand=False, pady=(0, 0))
-
-
-        self.scrollable_frame = tk.Frame(self, bg=GRAY_LIGHT)
-        self.scrollable_frame.pack(fill="both", expand=True)
-        tk.Label(self.scrollable_frame, text="Choose your Enavroom", font=FONT_TITLE, bg=GRAY_LIGHT, fg=TEXT_COLOR).pack(pady=(10, 10))
-
-        self.vehicle_option_frames = []
-        # Define vehicle options based on initial vehicle type from HomePage
-        vehicle_configs = []
-        if self.initial_vehicle_type == "Enavroom-vroom":
-            vehicle_configs = [
-                {"type": "Enavroom-vroom", "icon": "enavroom.png", "title": "Enavroom-vroom", "passengers": "1", "description": "Beat the traffic on a motorcycle ride."}
-            ]
-        elif "Car" in self.initial_vehicle_type:
-            vehicle_configs = [
-                {"type": "Car (4-seater)", "icon": "car.png", "title": "Car (4-seater)", "passengers": "4", "description": "Get around town affordably, up to 4 passengers."},
-                {"type": "Car (6-seater)", "icon": "car.png", "title": "Car (6-seater)", "passengers": "6", "description": "Roomy and affordable rides for up to six."}
-            ]
-
-        for config in vehicle_configs:
-            calculated_price = self.controller.booking_system.calculate_cost(config["type"], self.trip_distance)
-            option_data = {
-                "icon": config["icon"],
-                "title": config["title"],
-                "passengers": config["passengers"],
-                "description": config["description"],
-                "price": f"{calculated_price:.2f}"
-            }
-            frame = self.create_service_option(self.scrollable_frame, **option_data)
-            frame.pack(fill="x", padx=self.CENTER_PADX_VEHICLE, pady=5)
-            self.vehicle_option_frames.append((frame, config["type"]))
-            bind_widgets_recursively(frame, lambda e, f=frame, t=config["type"]: self.select_vehicle_option(f, t))
-
-        for frame, vehicle_type_name in self.vehicle_option_frames:
-            if vehicle_type_name == self.initial_vehicle_type:
-                self.select_vehicle_option(frame, vehicle_type_name)
-                break
-
-        payment_frame = tk.Frame(self.scrollable_frame, bg=WHITE, bd=1, relief="solid", padx=10, pady=5)
-        payment_frame.pack(fill="x", padx=self.CENTER_PADX_PAYMENT_BOOK, pady=(10, 10))
-
-        cash_img = load_image("cash_2.png", (30, 30))
-        cash_button_frame = tk.Frame(payment_frame, bg=WHITE)
-        cash_button_frame.pack(side="left", expand=True, padx=10)
-        if cash_img:
-            cash_icon_label = tk.Label(cash_button_frame, image=cash_img, bg=WHITE)
-            cash_icon_label.image = cash_img
-            cash_icon_label.pack(pady=(5, 0))
-        else:
-            tk.Label(cash_button_frame, text="C", font=("Arial", 20), bg="lightgray", relief="solid").pack(pady=(0, 5))
-        tk.Label(cash_button_frame, text="Cash", font=FONT_SUBTITLE, bg=WHITE, fg=TEXT_COLOR).pack()
-        bind_widgets_recursively(cash_button_frame, lambda e: self.select_payment_method("Cash"))
-
-        wallet_img = load_image("wallet_2.png", (30, 30))
-        wallet_button_frame = tk.Frame(payment_frame, bg=WHITE)
-        wallet_button_frame.pack(side="left", expand=True, padx=10)
-        if wallet_img:
-            wallet_icon_label = tk.Label(wallet_button_frame, image=wallet_img, bg=WHITE)
-            wallet_icon_label.image = wallet_img
-            wallet_icon_label.pack(pady=(5, 0))
-        else:
-            tk.Label(wallet_button_frame, text="W", font=("Arial", 20), bg="lightgray", relief="solid").pack(pady=(0, 5))
-        tk.Label(wallet_button_frame, text="Wallet", font=FONT_SUBTITLE, bg=WHITE, fg=TEXT_COLOR).pack()
-        bind_widgets_recursively(wallet_button_frame, lambda e: self.select_payment_method("Wallet"))
-
-        book_now_button = tk.Button(self.scrollable_frame, text="Book Now", command=self.on_book_now,
-                                    font=FONT_BUTTON, bg=PURPLE_DARK, fg=WHITE,
-                                    padx=20, pady=10, relief="raised", bd=0, cursor="hand2")
-        book_now_button.pack(fill="x", padx=self.CENTER_PADX_PAYMENT_BOOK, pady=(10, 10))  
+        self._refresh()
 
 class LoadingPage(tk.Frame):
     def __init__(self, parent, controller):
@@ -887,11 +1083,22 @@ class LoadingPage(tk.Frame):
     def on_show(self):
         self.dots_count = 0
         self._animate_loading()
-        # Schedule the transition after a delay (e.g., 3 seconds)
-        # Cancel any previous pending transition
+        # Cancel any previous pending search
         if hasattr(self, 'transition_id') and self.transition_id:
             self.after_cancel(self.transition_id)
-        self.transition_id = self.after(3000, self._transition_to_driver_found) # 3 seconds delay
+        # Deferred so this page is raised before the driver page replaces it
+        self.transition_id = self.after(0, self._find_driver)
+
+    def _find_driver(self):
+        """Asks the dispatcher for the nearest free driver, retrying while every driver is busy."""
+        details = self.controller.current_booking_details
+        assignment = self.controller.dispatcher.match(details.get("vehicle_type") or "Enavroom-vroom",
+                                                      details.get("pickup_location", "PUP Main"))
+        if assignment is None:
+            self.transition_id = self.after(DRIVER_SEARCH_RETRY_MS, self._find_driver)
+            return
+        self.controller.update_booking_details(driver_assignment=assignment)
+        self._transition_to_driver_found()
 
     def on_hide(self):
         # Stop animation when leaving the page
@@ -919,7 +1126,7 @@ class LoadingPage(tk.Frame):
     def _on_cancel_booking(self):
         # cancel booking -> home_page.py
         booking_id = self.controller.current_booking_details.get("booking_id")
-        if booking_id and self.controller.booking_system.cancel(booking_id):
+        if booking_id and self.controller.booking_service.cancel(booking_id):
             messagebox.showinfo("Cancelled", "Your booking has been cancelled.")
         else:
             messagebox.showwarning("Error", "Could not cancel booking or no active booking found.")
@@ -949,9 +1156,13 @@ class WeFoundDriverBasePage(tk.Frame):
         else:
             tk.Label(self, text="Driver Pic", font=("Arial", 16), bg="lightgray", width=10, height=5).pack(pady=10)
 
-        tk.Label(self, text="Driver Name: John Doe", font=FONT_BODY, bg=GRAY_LIGHT, fg=TEXT_COLOR).pack(pady=5)
-        tk.Label(self, text="Plate No: ABC 123", font=FONT_BODY, bg=GRAY_LIGHT, fg=TEXT_COLOR).pack(pady=5)
-        tk.Label(self, text="ETA: 5 mins", font=FONT_BODY, bg=GRAY_LIGHT, fg=TEXT_COLOR).pack(pady=5)
+        # Filled in from the dispatcher's assignment each time the page is shown
+        self.driver_name_label = tk.Label(self, text="Driver Name: -", font=FONT_BODY, bg=GRAY_LIGHT, fg=TEXT_COLOR)
+        self.driver_name_label.pack(pady=5)
+        self.plate_label = tk.Label(self, text="Plate No: -", font=FONT_BODY, bg=GRAY_LIGHT, fg=TEXT_COLOR)
+        self.plate_label.pack(pady=5)
+        self.eta_label = tk.Label(self, text="ETA: -", font=FONT_BODY, bg=GRAY_LIGHT, fg=TEXT_COLOR)
+        self.eta_label.pack(pady=5)
 
         self.cancel_button = tk.Button(self, text="Cancel Ride", command=self._on_cancel_ride,
                                          font=FONT_BUTTON, bg=RED_COLOR, fg=WHITE,
@@ -972,10 +1183,22 @@ class WeFoundDriverBasePage(tk.Frame):
         cancel_btn.place(relx=0.9, rely=0.5, anchor="center") # Top right corner
 
     def on_show(self):
-        # Automatically transition to DonePage after a delay
+        assignment = self.controller.current_booking_details.get("driver_assignment")
+        eta_minutes = assignment.eta_minutes if assignment else 5
+        if assignment:
+            self.driver_name_label.config(text=f"Driver Name: {assignment.driver.name}")
+            self.plate_label.config(text=f"Plate No: {assignment.driver.plate}")
+        self.eta_label.config(text=f"ETA: {eta_minutes} min{'s' if eta_minutes != 1 else ''}")
+        # Move on to DonePage once the driver's ETA has played out
         if self.after_id_transition:
             self.after_cancel(self.after_id_transition)
-        self.after_id_transition = self.after(5000, self._transition_to_done) # 5 seconds delay to done page
+        self.after_id_transition = self.after(eta_minutes * DEMO_MS_PER_MINUTE, self._transition_to_done)
+
+    def _release_driver(self, location=None):
+        assignment = self.controller.current_booking_details.get("driver_assignment")
+        if assignment:
+            self.controller.dispatcher.release(assignment, location)
+            self.controller.update_booking_details(driver_assignment=None)
 
     def on_hide(self):
         if self.after_id_transition:
@@ -985,15 +1208,18 @@ class WeFoundDriverBasePage(tk.Frame):
     def _on_cancel_ride(self):
         # If cancel button clicked -> HomePage
         booking_id = self.controller.current_booking_details.get("booking_id")
-        if booking_id and self.controller.booking_system.cancel(booking_id):
+        if booking_id and self.controller.booking_service.cancel(booking_id):
             messagebox.showinfo("Ride Cancelled", "Your ride has been cancelled.")
         else:
             messagebox.showwarning("Error", "Could not cancel ride or no active booking found.")
+        self._release_driver() # The driver never moved
         self.controller.show_frame("HomePage")
         self.on_hide()
 
     def _transition_to_done(self):
         self.on_hide()
+        # The ride is over: the driver waits for the next fare at the drop-off
+        self._release_driver(self.controller.current_booking_details.get("dropoff_location"))
         self.controller.show_frame("DonePage")
 
 
@@ -1050,10 +1276,10 @@ class DonePage(tk.Frame):
 
     def clear_history(self):
         if messagebox.askyesno("Clear All History", "Are you sure you want to delete all booking history?"):
-            self.controller.booking_system.clear_all()
-            # Also clear the .txt log
-            open("booking_log.txt", "w").close()
-            self.update_history_display()
+            self.controller.booking_system.clear_all() # Also empties the booking log
+            history_page = self.controller.frames.get("HistoryPage") # Only refresh it if it was ever built
+            if history_page is not None:
+                history_page.update_history_display()
             messagebox.showinfo("Cleared", "All booking history has been cleared.")
 
         # summary_text = (
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# --- On-disk Thumbnail Cache ---
+# Route maps ship as ~1MB PNGs but are only ever shown at 375x160. Decoding and
+# LANCZOS-resizing them on every launch is the slow part of showing a map, so the
+# scaled result is written once to a small PNG and read back on later launches.
+
+THUMBNAIL_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.enavroom_cache', 'thumbnails')
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=THUMBNAIL_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _entry_prefix(self, filepath, size, is_circular):
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        return f"{stem}_{size[0]}x{size[1]}_{'circle' if is_circular else 'rect'}_"
+
+    def _entry_path(self, filepath, size, is_circular):
+        """Names the thumbnail after the source file's identity, so editing an asset
+        (new mtime or size) simply misses the old entry instead of serving it."""
+        st = os.stat(filepath)
+        source_id = f"{os.path.abspath(filepath)}|{st.st_mtime_ns}|{st.st_size}"
+        digest = hashlib.sha1(source_id.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, self._entry_prefix(filepath, size, is_circular) + digest + ".png")
+
+    def get(self, filepath, size, is_circular=False):
+        """Returns the cached, already-scaled PIL image, or None on a miss."""
+        try:
+            path = self._entry_path(filepath, size, is_circular)
+            if not os.path.exists(path):
+                instrumentation.count("images.thumbnail_miss")
+                return None
+            img = Image.open(path)
+            img.load() # Read now so the file handle is released
+            instrumentation.count("images.thumbnail_hit")
+            return img
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable thumbnail for %s: %s", filepath, e)
+            return None
+
+    def put(self, filepath, size, is_circular, pil_img):
+        """Stores a scaled image and drops thumbnails made from older versions of the source."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._entry_path(filepath, size, is_circular)
+            # Unique per writer: background loaders may store the same entry concurrently
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            pil_img.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+            prefix = self._entry_prefix(filepath, size, is_circular)
+            for name in os.listdir(self.cache_dir):
+                stale = os.path.join(self.cache_dir, name)
+                if name.startswith(prefix) and name.endswith(".png") and stale != path:
+                    os.remove(stale)
+        except OSError as e:
+            # A read-only home directory just means no cache, not a broken app
+            logger.warning("Could not cache thumbnail for %s: %s", filepath, e)
+
+    def clear(self):
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, name))
+
+thumbnail_cache = ThumbnailCache()
+
+
+# --- In-memory PhotoImage Cache ---
+
+class PhotoImageLRU:
+    """Least-recently-used cache of Tk PhotoImages, bounded by decoded pixel bytes.
+
+    Evicting an entry only drops the cache's own reference. Every widget that shows
+    an image also keeps it as widget.image, so an image on screen stays alive until
+    its widget is destroyed; an evicted image is simply decoded again on next use.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict() # key -> (photo, bytes), oldest first
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, photo):
+        size = photo.width() * photo.height() * 4 # Tk keeps images as 32-bit pixels
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (photo, size)
+        self.total_bytes += size
+        # Never evict the entry just added, even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
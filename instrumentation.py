@@ -0,0 +1,148 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# --- Instrumentation ---
+# Named timers and counters for the hot paths (persistence, image loads, page
+# transitions). Off by default: a disabled timer() hands back a shared no-op and
+# count() returns after one flag check, so leaving the calls in costs next to nothing.
+# Turn it on with enable(), or by starting the app with ENAVROOM_METRICS=<file>, which
+# also writes a snapshot at exit (Prometheus text for .prom files, JSON otherwise).
+
+logger = logging.getLogger(__name__)
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {} # name -> int
+_timers = {} # name -> [count, total seconds, min, max]
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+def count(name, amount=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def record(name, seconds):
+    """Adds one timing sample to the named timer."""
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            _timers[name] = [1, seconds, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds < stats[2]:
+                stats[2] = seconds
+            if seconds > stats[3]:
+                stats[3] = seconds
+
+class _Timer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.started)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def timer(name):
+    """with timer("store.load"): ... records how long the block took."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+def timed(name):
+    """Decorator form of timer()."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+def snapshot():
+    """Current counters and timer statistics (seconds) as plain dicts."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timers": {name: {"count": n, "total": total, "mean": total / n, "min": low, "max": high}
+                       for name, (n, total, low, high) in _timers.items()},
+        }
+
+def to_prometheus(data=None):
+    """Renders a snapshot in the Prometheus text exposition format."""
+    data = data if data is not None else snapshot()
+    lines = []
+    for name, value in sorted(data["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, stats in sorted(data["timers"].items()):
+        metric = _metric_name(name) + "_seconds"
+        lines += [f"# TYPE {metric} summary", f"{metric}_count {stats['count']}", f"{metric}_sum {stats['total']:.9f}",
+                  f"# TYPE {metric}_max gauge", f"{metric}_max {stats['max']:.9f}"]
+    return "\n".join(lines) + "\n"
+
+def _metric_name(name):
+    return "enavroom_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+def export(path):
+    """Writes a snapshot to path: Prometheus text if it ends in .prom or .txt, JSON otherwise."""
+    data = snapshot()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        if path.endswith((".prom", ".txt")):
+            f.write(to_prometheus(data))
+        else:
+            json.dump(data, f, indent=2)
+    os.replace(tmp_path, path) # Scrapers never see a half-written file
+    logger.info("Wrote metrics to %s", path)
+
+def configure_from_env():
+    """Enables instrumentation and exports at exit when ENAVROOM_METRICS names a file."""
+    path = os.environ.get("ENAVROOM_METRICS")
+    if path:
+        enable()
+        atexit.register(export, path)
+
+def configure_logging(level=None):
+    """Sets up levelled logging; the level comes from ENAVROOM_LOG_LEVEL, default WARNING."""
+    level = level or os.environ.get("ENAVROOM_LOG_LEVEL", "WARNING")
+    logging.basicConfig(level=level.upper(), format="%(levelname)s %(name)s: %(message)s")
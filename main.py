@@ -1,11 +1,27 @@
 # Main
-from gui import App
+import sys
+
+import instrumentation
+
+# Before running the code, make sure to put the assets folder in your C:\Users\<User>  directory
+# for it will be responsible for the images and other assets used in the application.
+#
+# Booking operations can also run without the GUI, e.g.:
+#     python main.py quote "PUP Main" CEA --vehicle "Car (4-seater)"
+#     python main.py book "PUP Main" CEA --payment Wallet
+#     python main.py list --status booked
+#
+# ENAVROOM_LOG_LEVEL=DEBUG shows diagnostic logging; ENAVROOM_METRICS=metrics.prom (or .json)
+# turns on timers and counters and writes them out when the app exits.
 
 if __name__ == "__main__":
+    instrumentation.configure_from_env()
+    if len(sys.argv) > 1:
+        # Command-line booking operations never import Tk or PIL
+        from cli import main
+        sys.exit(main(sys.argv[1:]))
+
+    instrumentation.configure_logging()
+    from gui import App
     app = App()
     app.mainloop()
-
-"""
-before running the code, make sure to put the assets folder in your C:\Users\<User>  directory
-for it will be responsible for the images and other assets used in the application.
-"""
\ No newline at end of file
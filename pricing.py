@@ -0,0 +1,124 @@
+import threading
+import time
+
+# --- Surge Pricing ---
+# Demand is measured as bookings picked up at each location over a sliding window
+# (10 minutes by default). The window is a ring of short buckets: recording a booking
+# adds one to the current bucket and to a running total per location, and buckets
+# that fall out of the window are subtracted from the totals as time moves on, so
+# each event costs O(1) however busy it gets.
+#
+# Fares are multiplied by a surge factor per pickup location and vehicle class. It
+# rises by SURGE_STEP for every `demand_per_step` recent bookings above `baseline`, up
+# to the class's cap, and is fixed for the length of one pricing bucket (30 s by
+# default): the first quote in a bucket computes it, every other quote in that bucket
+# is a dict lookup. Customers therefore see stable prices while demand updates keep
+# streaming in underneath.
+
+SURGE_STEP = 0.1
+MAX_SURGE = { # Motorcycles are cheap to add to a busy area, so they surge less
+    "Enavroom-vroom": 1.5,
+    "Car (4-seater)": 2.0,
+    "Car (6-seater)": 2.0,
+}
+DEFAULT_MAX_SURGE = 2.0
+
+class DemandTracker:
+    def __init__(self, window_seconds=600, bucket_seconds=10, clock=time.monotonic):
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self._buckets = [{} for _ in range(max(1, round(window_seconds / bucket_seconds)))] # location -> count
+        self._totals = {} # location -> count over the whole window
+        self._current = int(clock() // bucket_seconds) # Number of the newest bucket
+        self._lock = threading.Lock()
+
+    def _advance(self, now):
+        bucket = int(now // self.bucket_seconds)
+        if bucket <= self._current: # Still in the newest bucket: nothing expires
+            return
+        # Expire every bucket that left the window; at most one full lap of the ring
+        for number in range(max(self._current + 1, bucket - len(self._buckets) + 1), bucket + 1):
+            expired = self._buckets[number % len(self._buckets)]
+            for location, count in expired.items():
+                remaining = self._totals[location] - count
+                if remaining:
+                    self._totals[location] = remaining
+                else:
+                    del self._totals[location]
+            expired.clear()
+        self._current = bucket
+
+    def record(self, location, count=1, now=None):
+        """Counts count bookings picked up at location."""
+        with self._lock:
+            self._advance(self.clock() if now is None else now)
+            bucket = self._buckets[self._current % len(self._buckets)]
+            bucket[location] = bucket.get(location, 0) + count
+            self._totals[location] = self._totals.get(location, 0) + count
+
+    def demand(self, location, now=None):
+        """Bookings picked up at location within the window."""
+        with self._lock:
+            self._advance(self.clock() if now is None else now)
+            return self._totals.get(location, 0)
+
+    def snapshot(self, now=None):
+        with self._lock:
+            self._advance(self.clock() if now is None else now)
+            return dict(self._totals)
+
+
+class SurgePricing:
+    def __init__(self, tracker=None, baseline=5, demand_per_step=5, max_surge=None, bucket_seconds=30,
+                 clock=time.monotonic):
+        self.tracker = tracker if tracker is not None else DemandTracker(clock=clock)
+        self.baseline = baseline # Recent bookings a location absorbs before prices rise
+        self.demand_per_step = demand_per_step
+        self.max_surge = dict(MAX_SURGE if max_surge is None else max_surge)
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self._bucket = None
+        self._multipliers = {} # (location, vehicle_type) -> multiplier, for the current bucket
+        self._fares = {} # (start, end, vehicle_type) -> cost, for the current bucket
+
+    def _start_bucket(self, bucket):
+        # Swap in fresh dicts instead of clearing, so a concurrent reader never sees a half-cleared cache
+        self._multipliers, self._fares = {}, {}
+        self._bucket = bucket
+
+    def clear_cache(self):
+        """Drops cached multipliers and fares, e.g. after the tariff changed."""
+        self._bucket = None
+
+    def multiplier(self, location, vehicle_type):
+        bucket = int(self.clock() // self.bucket_seconds)
+        if bucket != self._bucket:
+            self._start_bucket(bucket)
+        multipliers = self._multipliers
+        key = (location, vehicle_type)
+        value = multipliers.get(key)
+        if value is None:
+            excess = self.tracker.demand(location) - self.baseline
+            steps = excess // self.demand_per_step if excess > 0 else 0
+            value = multipliers[key] = round(min(1.0 + steps * SURGE_STEP,
+                                                 self.max_surge.get(vehicle_type, DEFAULT_MAX_SURGE)), 2)
+        return value
+
+    def fare(self, start, end, vehicle_type, base_fare):
+        """
+        Surge-adjusted fare for a route. base_fare(vehicle_type) is called only on the
+        first quote of the route in each pricing bucket; later quotes are one lookup.
+        """
+        bucket = int(self.clock() // self.bucket_seconds)
+        if bucket != self._bucket:
+            self._start_bucket(bucket)
+        fares = self._fares
+        key = (start, end, vehicle_type)
+        cost = fares.get(key)
+        if cost is None:
+            cost = fares[key] = round(base_fare(vehicle_type) * self.multiplier(start, vehicle_type), 2)
+        return cost
+
+    def record_bookings(self, bookings):
+        for booking in bookings:
+            self.tracker.record(booking.start)
@@ -0,0 +1,94 @@
+import math
+
+# --- Multi-stop Route Optimization ---
+# A shared ride starts at one pick-up and visits several drop-offs in any order.
+# The order is chosen to minimize total kilometers: exactly (Held-Karp dynamic
+# programming) for small stop counts, and with nearest-neighbour plus 2-opt above.
+
+EXACT_STOP_LIMIT = 10 # Held-Karp is O(2^n * n^2); beyond this the heuristic is used
+
+def optimize_stop_order(pickup, dropoffs, distance):
+    """
+    Orders the drop-offs to minimize the total distance of a trip starting at pickup,
+    where distance(a, b) gives the km between two locations.
+    The trip ends at whichever drop-off comes last. Duplicate drop-offs, and drop-offs
+    equal to the pick-up, are visited once / skipped.
+    Returns (ordered drop-offs, total distance).
+    """
+    stops = []
+    for stop in dropoffs:
+        if stop != pickup and stop not in stops:
+            stops.append(stop)
+    if not stops:
+        return [], 0.0
+
+    # Node 0 is the pick-up, node i + 1 is stops[i]
+    nodes = [pickup] + stops
+    d = [[distance(a, b) if a != b else 0.0 for b in nodes] for a in nodes]
+    if len(stops) <= EXACT_STOP_LIMIT:
+        order = _held_karp(d, len(stops))
+    else:
+        order = _two_opt(d, _nearest_neighbour(d, len(stops)))
+    return [stops[i - 1] for i in order], _path_length(d, [0] + order)
+
+def _path_length(d, path):
+    return sum(d[a][b] for a, b in zip(path, path[1:]))
+
+def _held_karp(d, n):
+    """Exact shortest open path from node 0 through nodes 1..n."""
+    full = (1 << n) - 1
+    best = [[math.inf] * n for _ in range(full + 1)] # best[mask][j]: visited mask, standing at stop j
+    parent = [[-1] * n for _ in range(full + 1)]
+    for j in range(n):
+        best[1 << j][j] = d[0][j + 1]
+    for mask in range(1, full + 1):
+        row = best[mask]
+        for j in range(n):
+            cost = row[j]
+            if cost == math.inf:
+                continue
+            d_j = d[j + 1]
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                next_mask = mask | (1 << k)
+                candidate = cost + d_j[k + 1]
+                if candidate < best[next_mask][k]:
+                    best[next_mask][k] = candidate
+                    parent[next_mask][k] = j
+
+    last = min(range(n), key=lambda j: best[full][j])
+    order, mask = [], full
+    while last != -1:
+        order.append(last + 1)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    order.reverse()
+    return order
+
+def _nearest_neighbour(d, n):
+    order, current, remaining = [], 0, set(range(1, n + 1))
+    while remaining:
+        current = min(remaining, key=lambda k: d[current][k])
+        order.append(current)
+        remaining.remove(current)
+    return order
+
+def _two_opt(d, order):
+    """Reverses segments of the open path while that shortens it."""
+    path = [0] + order
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(path) - 1):
+            for j in range(i + 1, len(path)):
+                a, b, c = path[i - 1], path[i], path[j]
+                before = d[a][b]
+                after = d[a][c]
+                if j + 1 < len(path):
+                    e = path[j + 1]
+                    before += d[c][e]
+                    after += d[b][e]
+                if after < before - 1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+    return path[1:]
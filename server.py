@@ -0,0 +1,336 @@
+import asyncio
+import http.client
+import ipaddress
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from booking import Booking, DuplicateBookingError
+from booking_service import BookingService, BookingError
+
+logger = logging.getLogger(__name__)
+
+# --- Asyncio Booking Server ---
+# Serves the BookingService over HTTP/JSON on the loopback interface, so the GUI,
+# scripts and load tests can all be clients of one process. Quotes are pure
+# arithmetic and are answered on the event loop. Everything that touches storage
+# runs on a single writer thread, so the loop never blocks on disk and the
+# (single-threaded) BookingSystem is never entered twice at once. Bookings that
+# arrive together are committed together: one storage write and one log write per
+# batch instead of per booking.
+#
+#   POST /quote    {"vehicle_type", "start", "end"}  or  {"vehicle_type", "start", "stops": [...]}
+#   POST /book     {"vehicle_type", "start", "end", "payment_method"}
+#   POST /cancel   {"booking_id"}
+#   GET  /bookings?status=&start=&end=&vehicle_type=&limit=&offset=
+#   GET  /health
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BATCH = 500 # Bookings committed per storage write
+MAX_BODY_BYTES = 1024 * 1024
+
+class BookingServer:
+    def __init__(self, service=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        if not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f"Refusing to serve bookings on non-loopback address {host}.")
+        self.service = service if service is not None else BookingService()
+        self.host = host
+        self.port = port
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="booking-writer")
+        self.server = None
+        self._book_queue = None
+        self._commit_task = None
+
+    async def start(self):
+        self._book_queue = asyncio.Queue()
+        self._commit_task = asyncio.create_task(self._commit_bookings())
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1] # Resolves port 0 to the one picked
+        logger.info("Booking server listening on http://%s:%s", self.host, self.port)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._commit_task is not None:
+            self._commit_task.cancel()
+        await asyncio.get_running_loop().run_in_executor(self.writer, self.service.booking_system.save)
+        self.writer.shutdown(wait=True)
+
+    async def _in_writer(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, function, *args)
+
+    # --- Request handlers ---
+
+    async def quote(self, request):
+        if "stops" in request:
+            return self.service.quote_trip(request.get("start"), request.get("stops"), request.get("vehicle_type"),
+                                           optimize=request.get("optimize", True))
+        return self.service.quote(request.get("start"), request.get("end"), request.get("vehicle_type"))
+
+    async def book(self, request):
+        booking = self.service.price_request(request) # Rejects bad requests before they join a batch
+        done = asyncio.get_running_loop().create_future()
+        await self._book_queue.put((booking, done))
+        return (await done).to_dict()
+
+    async def cancel(self, request):
+        if not await self._in_writer(self.service.cancel, request.get("booking_id")):
+            raise BookingError(f"No booking with ID {request.get('booking_id')}.")
+        return {"booking_id": request.get("booking_id"), "status": "cancelled"}
+
+    async def list_bookings(self, query):
+        limit = query.get("limit")
+        bookings = await self._in_writer(
+            self.service.list_bookings, query.get("status"), query.get("start"), query.get("end"),
+            query.get("vehicle_type"), int(limit) if limit else None, int(query.get("offset") or 0))
+        return {"bookings": [booking.to_dict() for booking in bookings]}
+
+    async def _commit_bookings(self):
+        """Drains queued bookings and stores each batch with one add_bookings call."""
+        while True:
+            batch = [await self._book_queue.get()]
+            while len(batch) < MAX_BATCH and not self._book_queue.empty():
+                batch.append(self._book_queue.get_nowait())
+            try:
+                rejected = await self._in_writer(self.service.booking_system.add_bookings,
+                                                 [booking for booking, _ in batch])
+            except Exception as e:
+                for _, done in batch:
+                    done.set_exception(BookingError(f"Failed to confirm booking: {e}"))
+                continue
+            rejected_ids = {id(booking) for booking in rejected}
+            for booking, done in batch:
+                if id(booking) in rejected_ids: # Only that request fails, not the whole batch
+                    done.set_exception(DuplicateBookingError(booking.id))
+                else:
+                    done.set_result(booking)
+
+    # --- HTTP plumbing ---
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "Request body too large."})
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._dispatch(method, target, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass # Client went away or sent garbage; drop the connection
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        try:
+            if method == "GET" and url.path == "/health":
+                return 200, {"status": "ok"}
+            if method == "GET" and url.path == "/bookings":
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                return 200, await self.list_bookings(query)
+            routes = {"/quote": self.quote, "/book": self.book, "/cancel": self.cancel}
+            if method == "POST" and url.path in routes:
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict):
+                    raise BookingError("Request is not a JSON object.")
+                return 200, await routes[url.path](request)
+            return 404, {"error": f"No route for {method} {url.path}."}
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}
+        except (BookingError, ValueError) as e: # ValueError: a malformed query parameter
+            return 400, {"error": str(e)}
+        except Exception as e:
+            logger.exception("%s %s failed: %s", method, target, e)
+            return 500, {"error": "Internal server error."}
+
+    @staticmethod
+    async def _respond(writer, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        reason = http.client.responses.get(status, "")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+
+# --- Clients ---
+
+class BookingClient:
+    """
+    Blocking client with the same quote/book/cancel/list_bookings methods as
+    BookingService, so callers can switch between in-process and remote service.
+    """
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+
+    @classmethod
+    def from_url(cls, url):
+        parts = urlsplit(url)
+        return cls(parts.hostname or DEFAULT_HOST, parts.port or DEFAULT_PORT)
+
+    def _call(self, method, path, payload=None):
+        body = json.dumps(payload) if payload is not None else None
+        for attempt in range(2): # Reconnect once if the kept-alive connection was dropped
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = self.conn.getresponse()
+                data = json.loads(response.read() or b"{}")
+                if not isinstance(data, dict):
+                    raise ValueError("response is not a JSON object")
+                break
+            except (ConnectionError, http.client.HTTPException):
+                self.close()
+                if attempt:
+                    raise BookingError(f"Booking server at {self.host}:{self.port} is not responding.")
+            except OSError as e: # Timed out, or unreachable. Not retried: a timed-out booking may have gone through
+                self.close()
+                raise BookingError(f"Booking server at {self.host}:{self.port} is not responding ({e}).") from None
+            except ValueError:
+                self.close()
+                raise BookingError(f"Booking server at {self.host}:{self.port} sent an unreadable response.") from None
+        if response.status != 200:
+            raise BookingError(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    def quote(self, start, end, vehicle_type):
+        return self._call("POST", "/quote", {"start": start, "end": end, "vehicle_type": vehicle_type})
+
+    def book(self, vehicle_type, start, end, payment_method="Cash"):
+        return Booking.from_dict(self._call("POST", "/book", {
+            "vehicle_type": vehicle_type, "start": start, "end": end, "payment_method": payment_method}))
+
+    def cancel(self, booking_id):
+        try:
+            self._call("POST", "/cancel", {"booking_id": booking_id})
+        except BookingError:
+            return False
+        return True
+
+    def list_bookings(self, status=None, start=None, end=None, vehicle_type=None, limit=None, offset=0):
+        query = {"status": status, "start": start, "end": end, "vehicle_type": vehicle_type,
+                 "limit": limit, "offset": offset or None}
+        params = urlencode({key: value for key, value in query.items() if value is not None})
+        data = self._call("GET", "/bookings" + (f"?{params}" if params else ""))
+        return [Booking.from_dict(item) for item in data["bookings"]]
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+async def _async_call(reader, writer, method, path, payload):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+# --- Load Test ---
+
+async def load_test(host, port, clients=50, requests_per_client=200, book_every=5):
+    """
+    Runs clients concurrent keep-alive connections, each sending requests_per_client
+    requests: every book_every-th one books, the rest quote. Returns throughput and
+    latency percentiles in milliseconds.
+    """
+    from bookingsystem import DISTANCE_MATRIX, VEHICLE_TYPES
+    routes = list(DISTANCE_MATRIX)
+    latencies = {"quote": [], "book": []}
+    errors = 0
+
+    async def client(number):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in range(requests_per_client):
+                start, end = routes[(number + i) % len(routes)]
+                kind = "book" if i % book_every == 0 else "quote"
+                request = {"start": start, "end": end, "vehicle_type": VEHICLE_TYPES[i % len(VEHICLE_TYPES)]}
+                started = time.perf_counter()
+                status, _ = await _async_call(reader, writer, "POST", f"/{kind}", request)
+                latencies[kind].append(time.perf_counter() - started)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    seconds = time.perf_counter() - started
+
+    def percentile(values, fraction):
+        values = sorted(values)
+        return values[int(fraction * (len(values) - 1))] * 1000 if values else 0.0
+
+    total = sum(len(values) for values in latencies.values())
+    report = {"clients": clients, "requests": total, "errors": errors, "seconds": seconds,
+              "requests_per_second": total / seconds if seconds > 0 else 0.0}
+    for kind, values in latencies.items():
+        report[f"{kind}_p50_ms"] = percentile(values, 0.50)
+        report[f"{kind}_p95_ms"] = percentile(values, 0.95)
+    return report
+
+async def _self_load_test(clients, requests_per_client):
+    """Load-tests an in-process server backed by throwaway files."""
+    with tempfile.TemporaryDirectory() as tmp:
+        service = BookingService(file=os.path.join(tmp, "bookings.json"), log_file=os.path.join(tmp, "booking_log.txt"),
+                                 event_file=os.path.join(tmp, "booking_events.jsonl"))
+        server = BookingServer(service, port=0)
+        await server.start()
+        try:
+            return await load_test(server.host, server.port, clients, requests_per_client)
+        finally:
+            await server.stop()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Load-test the booking server.")
+    parser.add_argument("--port", type=int, help="test a running server on this loopback port instead of a throwaway one")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    args = parser.parse_args()
+    if args.port:
+        report = asyncio.run(load_test(DEFAULT_HOST, args.port, args.clients, args.requests))
+    else:
+        report = asyncio.run(_self_load_test(args.clients, args.requests))
+    for key, value in report.items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
@@ -0,0 +1,524 @@
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import instrumentation
+from booking import Booking, DuplicateBookingError
+
+try:
+    import fcntl # POSIX advisory file locks
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt # Windows byte-range locks
+    except ImportError:
+        msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+# --- Storage Backends ---
+# BookingSystem talks to its bookings only through a BookingStore, so the JSON file
+# and the SQLite database are interchangeable. Stores hand out Booking objects and
+# record every change themselves; BookingSystem never writes files directly.
+
+class StoreLock:
+    """Re-entrant lock that serializes writers across threads and, given a path, across processes.
+
+    The outermost acquire in a process takes an exclusive advisory lock on the lock file
+    (fcntl.flock, or msvcrt.locking on Windows); nested acquires only count depth. Without
+    either module, only threads of the same process are serialized.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and self.path:
+            try:
+                self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            self._unlock_file()
+        self._thread_lock.release()
+
+    def _lock_file(self):
+        if self._fd is None: # Kept open between acquires; opening it is most of the cost
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue # LK_LOCK gives up after about 10 s; keep waiting like flock does
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def close(self):
+        with self._thread_lock:
+            if self._fd is not None and self._depth == 0:
+                os.close(self._fd)
+                self._fd = None
+
+
+class BookingStore:
+    """Interface shared by all booking storage backends.
+
+    Every store has a StoreLock as .lock; hold it to make several calls (say, a change
+    plus its log line) atomic with respect to other writers.
+    """
+
+    # Bumped on every change a store sees, so callers can skip work when it is unchanged
+    generation = 0
+
+    def load(self, force=False):
+        """Opens the underlying storage, picking up changes made by other writers.
+
+        Cheap when nothing changed since the last call; force=True always re-reads.
+        """
+        raise NotImplementedError
+
+    def add(self, booking):
+        """Persists a new booking. Raises DuplicateBookingError if its id is already stored."""
+        if self.add_many([booking]):
+            raise DuplicateBookingError(booking.id)
+
+    def add_many(self, bookings):
+        """Persists a batch of new bookings in one write.
+
+        A booking whose id is already stored (or earlier in the batch) is left out
+        rather than failing the batch; the left-out bookings are returned.
+        """
+        raise NotImplementedError
+
+    def set_status(self, booking_id, status):
+        """Changes a booking's status. Returns the updated Booking, or None if the id is unknown."""
+        raise NotImplementedError
+
+    def get(self, booking_id):
+        """Returns the Booking with the given id, or None."""
+        raise NotImplementedError
+
+    def query(self, status=None, start=None, end=None, vehicle_type=None, limit=None, offset=0):
+        """Returns bookings matching every given filter, oldest first."""
+        raise NotImplementedError
+
+    def count(self, status=None, start=None, end=None, vehicle_type=None):
+        """Returns how many bookings match every given filter."""
+        raise NotImplementedError
+
+    def all(self):
+        """Returns every booking, oldest first."""
+        return self.query()
+
+    def compact(self):
+        """Folds pending changes into the primary storage."""
+        pass
+
+    def clear(self):
+        """Deletes every booking."""
+        raise NotImplementedError
+
+    def close(self):
+        self.lock.close()
+
+
+class JsonBookingStore(BookingStore):
+    """Keeps every booking in memory, indexed by id, and persists them to a JSON file.
+
+    In journal mode add()/set_status() append one line to <file>.journal instead of
+    rewriting the whole snapshot; compact() folds the journal back into the file.
+
+    Several processes may share the files. Every change holds <file>.lock and first
+    catches up with whatever other writers stored (an incremental load), so a write is
+    always merged onto the latest state on disk instead of overwriting it.
+    """
+    COMPACT_EVERY = 500 # Minimum journal records to collect before folding them into the snapshot
+
+    def __init__(self, file="bookings.json", journal=False):
+        self.file = file
+        self.journal = journal
+        self.journal_file = file + ".journal"
+        self._journal_records = 0
+        self.bookings = []
+        self._by_id = {} # id -> Booking, so get()/set_status() never scan the list
+        self.generation = 0
+        self._loaded = False
+        self._snapshot_stat = None # (inode, mtime, size) of the snapshot we last read or wrote
+        self._journal_offset = 0 # Bytes of the journal already applied to self.bookings
+        self.lock = StoreLock(file + ".lock")
+
+    def load(self, force=False):
+        with self.lock: # Never read a snapshot or journal another writer is halfway through
+            if not force and self._loaded and self._snapshot_stat == self._stat(self.file):
+                journal_size = os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+                if journal_size == self._journal_offset:
+                    return # Nothing changed on disk
+                if journal_size > self._journal_offset:
+                    self._replay_journal() # Another writer appended; apply only the new tail
+                    return
+            self._load_snapshot()
+
+    @instrumentation.timed("store.load_snapshot")
+    def _load_snapshot(self):
+        self.bookings = []
+        self._by_id = {}
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._snapshot_stat = self._stat(self.file)
+        try:
+            if os.path.exists(self.file):
+                with open(self.file, "r") as f:
+                    data = json.load(f)
+                    for item in data:
+                        self._insert(Booking.from_dict(item))
+            else:
+                logger.info("%s not found. Starting with empty bookings.", self.file)
+        except json.JSONDecodeError as e:
+            logger.error("Could not decode JSON from %s: %s. Starting with empty bookings.", self.file, e)
+        self._replay_journal(repair=True)
+        self._loaded = True
+        self.generation += 1
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _insert(self, booking):
+        self.bookings.append(booking)
+        self._by_id[booking.id] = booking
+
+    def add_many(self, bookings):
+        with self.lock:
+            self.load() # Merge: start from what other writers have stored
+            added, rejected = [], []
+            for booking in bookings:
+                if booking.id in self._by_id:
+                    rejected.append(booking)
+                else:
+                    self._insert(booking)
+                    added.append(booking)
+            if added:
+                self.generation += 1
+                self._persist(*({"op": "book", "booking": booking.to_dict()} for booking in added))
+            return rejected
+
+    def set_status(self, booking_id, status):
+        with self.lock:
+            self.load() # The booking may have been made, or changed, by another writer
+            booking = self.get(booking_id)
+            if booking is None:
+                return None
+            booking.status = status
+            self.generation += 1
+            self._persist({"op": "status", "id": booking.id, "status": status})
+            return booking
+
+    def get(self, booking_id):
+        return self._by_id.get(booking_id)
+
+    def query(self, status=None, start=None, end=None, vehicle_type=None, limit=None, offset=0):
+        stop = None if limit is None else offset + limit
+        if status is None and start is None and end is None and vehicle_type is None:
+            return self.bookings[offset:stop] # A history page is a plain slice
+        # Scan lazily and stop at the last match the page needs
+        return list(itertools.islice(self._matching(status, start, end, vehicle_type), offset, stop))
+
+    def _matching(self, status, start, end, vehicle_type):
+        return (b for b in self.bookings
+                if (status is None or b.status == status)
+                and (start is None or b.start == start)
+                and (end is None or b.end == end)
+                and (vehicle_type is None or b.vehicle_type == vehicle_type))
+
+    def count(self, status=None, start=None, end=None, vehicle_type=None):
+        if status is None and start is None and end is None and vehicle_type is None:
+            return len(self.bookings)
+        return sum(1 for _ in self._matching(status, start, end, vehicle_type))
+
+    def all(self):
+        return self.bookings
+
+    def compact(self):
+        """Writes a full snapshot and empties the journal it now contains."""
+        with self.lock:
+            self.load() # Fold in what is on disk (ours and other writers') rather than dropping it
+            self._write_snapshot()
+
+    @instrumentation.timed("store.write_snapshot")
+    def _write_snapshot(self):
+        tmp_file = self.file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump([b.to_dict() for b in self.bookings], f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.file) # Atomic, so a crash never leaves a half-written snapshot
+        if os.path.exists(self.journal_file):
+            open(self.journal_file, "w").close()
+        self._journal_records = 0
+        self._journal_offset = 0
+        self._snapshot_stat = self._stat(self.file)
+        self._loaded = True
+
+    def clear(self):
+        with self.lock:
+            self.bookings = []
+            self._by_id = {}
+            self.generation += 1
+            self._write_snapshot()
+
+    @instrumentation.timed("store.persist")
+    def _persist(self, *records):
+        """Records changes, either as one journal append or by rewriting the snapshot."""
+        if not self.journal:
+            self._write_snapshot()
+            return
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            appended_at = f.tell()
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+            # If another writer appended since our last load, leave the offset alone so the
+            # next load() applies their records (and harmlessly re-applies ours).
+            if appended_at == self._journal_offset:
+                self._journal_offset = f.tell()
+        self._journal_records += len(records)
+        # Compacting only once the journal is as long as the snapshot keeps the
+        # rewrite cost amortized O(1) per record, however large the history grows.
+        if self._journal_records >= max(self.COMPACT_EVERY, len(self.bookings)):
+            self._write_snapshot()
+
+    @instrumentation.timed("store.replay_journal")
+    def _replay_journal(self, repair=False):
+        """Applies journal records past self._journal_offset.
+
+        With repair=True (a full load) a torn final record is cut off the file; an
+        incremental load just stops before it, since another writer may still be
+        finishing that line.
+        """
+        if not os.path.exists(self.journal_file):
+            return
+        good_offset = self._journal_offset
+        with open(self.journal_file, "rb") as f:
+            f.seek(good_offset)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("record is missing its terminating newline")
+                    record = json.loads(line)
+                except ValueError:
+                    if repair:
+                        logger.error("Dropping incomplete record at the end of %s.", self.journal_file)
+                    break
+                good_offset += len(line)
+                if record["op"] == "book":
+                    existing = self._by_id.get(record["booking"]["id"])
+                    if existing is None:
+                        self._insert(Booking.from_dict(record["booking"]))
+                    elif {**existing.to_dict(), "status": record["booking"]["status"]} != record["booking"]:
+                        # Not the harmless case below: a different booking under a taken id
+                        logger.error("Journal record for booking %s in %s conflicts with the stored booking "
+                                     "of that id; keeping the stored one.", existing.id, self.journal_file)
+                    # Otherwise a crash between snapshot and journal truncation replayed a record
+                    # the snapshot already holds; the status records after it still apply in order.
+                elif record["op"] == "status" and record["id"] in self._by_id:
+                    self._by_id[record["id"]].status = record["status"]
+                elif record["op"] == "cancel" and record["id"] in self._by_id:
+                    self._by_id[record["id"]].status = "cancelled"
+                self._journal_records += 1
+        if good_offset != self._journal_offset:
+            self._journal_offset = good_offset
+            self.generation += 1
+        # Only the last record can be torn by a crash mid-append; cut it off so the next
+        # append does not land behind a broken line.
+        if repair and good_offset < os.path.getsize(self.journal_file):
+            with open(self.journal_file, "r+b") as f:
+                f.truncate(good_offset)
+
+
+class SQLiteBookingStore(BookingStore):
+    """Keeps bookings in an indexed SQLite database instead of in memory.
+
+    Lookups by id, status, route and vehicle type use B-tree indexes, so they stay
+    O(log N) and only the requested rows are ever turned into Booking objects.
+    """
+    COLUMNS = "id, vehicle_type, start_location, end_location, distance, cost, payment_method, status, stops"
+    PLACEHOLDERS = "?, ?, ?, ?, ?, ?, ?, ?, ?"
+    INSERT = f"INSERT INTO bookings ({COLUMNS}) VALUES ({PLACEHOLDERS})"
+
+    def __init__(self, file="bookings.db"):
+        self.file = file
+        self.conn = None
+        self._own_changes = 0
+        # SQLite locks the database across processes itself; this only keeps threads
+        # from sharing the connection mid-transaction.
+        self.lock = StoreLock()
+
+    @property
+    def generation(self):
+        # data_version changes whenever another connection commits; our own commits
+        # do not move it, so they are counted separately.
+        if self.conn is None:
+            return (0, self._own_changes)
+        return (self.conn.execute("PRAGMA data_version").fetchone()[0], self._own_changes)
+
+    def load(self, force=False):
+        # Queries always read the database, so there is never anything to refresh
+        with self.lock:
+            if self.conn is None:
+                self._connect()
+
+    def _connect(self):
+        self.conn = sqlite3.connect(self.file, check_same_thread=False, timeout=30) # Wait out other processes' writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL") # Durable across app crashes; WAL makes commits a single append
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS bookings ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " id TEXT NOT NULL UNIQUE,"
+                " vehicle_type TEXT NOT NULL,"
+                " start_location TEXT NOT NULL,"
+                " end_location TEXT NOT NULL,"
+                " distance REAL NOT NULL,"
+                " cost REAL NOT NULL,"
+                " payment_method TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " stops TEXT)" # JSON list of intermediate drop-offs; NULL for single-leg trips
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(bookings)")]
+            if "stops" not in columns: # Databases created before multi-stop trips
+                self.conn.execute("ALTER TABLE bookings ADD COLUMN stops TEXT")
+            # The UNIQUE constraint already gives id its own index
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings (status)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_route ON bookings (start_location, end_location)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_vehicle ON bookings (vehicle_type)")
+
+    @instrumentation.timed("store.insert")
+    def add(self, booking):
+        self.load()
+        try:
+            with self.lock, self.conn:
+                self.conn.execute(self.INSERT, self._to_row(booking))
+        except sqlite3.IntegrityError: # The UNIQUE id constraint
+            raise DuplicateBookingError(booking.id) from None
+        self._own_changes += 1
+
+    @instrumentation.timed("store.insert_many")
+    def add_many(self, bookings):
+        self.load()
+        rows = [self._to_row(b) for b in bookings]
+        try:
+            with self.lock, self.conn: # One transaction, so one commit for the whole batch
+                self.conn.executemany(self.INSERT, rows)
+            self._own_changes += 1
+            return []
+        except sqlite3.IntegrityError:
+            pass
+        # An id is already taken and the batch was rolled back. Insert row by row in one
+        # transaction instead, leaving out only the clashing bookings.
+        rejected = []
+        with self.lock, self.conn:
+            for booking, row in zip(bookings, rows):
+                try:
+                    self.conn.execute(self.INSERT, row)
+                except sqlite3.IntegrityError:
+                    rejected.append(booking)
+        self._own_changes += 1
+        return rejected
+
+    @instrumentation.timed("store.set_status")
+    def set_status(self, booking_id, status):
+        self.load()
+        with self.lock, self.conn:
+            updated = self.conn.execute("UPDATE bookings SET status = ? WHERE id = ?", (status, booking_id)).rowcount
+        self._own_changes += updated
+        return self.get(booking_id) if updated else None
+
+    def get(self, booking_id):
+        self.load()
+        row = self.conn.execute(f"SELECT {self.COLUMNS} FROM bookings WHERE id = ?", (booking_id,)).fetchone()
+        return self._to_booking(row) if row else None
+
+    def query(self, status=None, start=None, end=None, vehicle_type=None, limit=None, offset=0):
+        self.load()
+        where, params = self._where(status, start, end, vehicle_type)
+        sql = f"SELECT {self.COLUMNS} FROM bookings{where} ORDER BY seq"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        return [self._to_booking(row) for row in self.conn.execute(sql, params)]
+
+    def count(self, status=None, start=None, end=None, vehicle_type=None):
+        self.load()
+        where, params = self._where(status, start, end, vehicle_type)
+        return self.conn.execute(f"SELECT COUNT(*) FROM bookings{where}", params).fetchone()[0]
+
+    def compact(self):
+        if self.conn is not None:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def clear(self):
+        self.load()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM bookings")
+        self._own_changes += 1
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    @staticmethod
+    def _where(status, start, end, vehicle_type):
+        clauses, params = [], []
+        for column, value in (("status", status), ("start_location", start),
+                              ("end_location", end), ("vehicle_type", vehicle_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    @staticmethod
+    def _to_row(booking):
+        return (booking.id, booking.vehicle_type, booking.start, booking.end, booking.distance,
+                booking.cost, booking.payment_method, booking.status,
+                json.dumps(list(booking.stops)) if booking.stops else None)
+
+    @staticmethod
+    def _to_booking(row):
+        booking_id, vehicle_type, start, end, distance, cost, payment_method, status, stops = row
+        return Booking(vehicle_type, start, end, distance, cost, payment_method, status, booking_id,
+                       json.loads(stops) if stops else ())
+
+
+def open_store(file, journal=False):
+    """Picks a backend from the file name: .db/.sqlite files use SQLite, anything else JSON."""
+    if file.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteBookingStore(file)
+    return JsonBookingStore(file, journal=journal)
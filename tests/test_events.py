@@ -0,0 +1,98 @@
+import json
+import multiprocessing
+import os
+
+from booking import Booking
+from bookingsystem import BookingSystem
+from events import EventLog, iter_events, last_seq, replay
+from storage import JsonBookingStore
+
+
+def make_booking(booking_id=None):
+    return Booking("Enavroom-vroom", "PUP Main", "CEA", 2.0, 60.0, "Cash", booking_id=booking_id)
+
+def _book_and_cancel(directory, rounds):
+    system = BookingSystem(os.path.join(directory, "bookings.json"), os.path.join(directory, "booking_log.txt"),
+                           journal=True, event_file=os.path.join(directory, "booking_events.jsonl"))
+    for i in range(rounds):
+        system.book("Enavroom-vroom", "PUP Main", "CEA", "Cash")
+        if i % 3 == 0: # Cancel the newest booking, often one the other process just made
+            newest = system.find_bookings(status="booked")
+            if newest:
+                system.cancel(newest[-1].id)
+    system.save()
+    system.store.close()
+    system.log.close()
+    system.events.close()
+
+
+def test_processes_sharing_a_log_get_unique_seqs_and_replay_matches_store(tmp_path):
+    directory = str(tmp_path)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_book_and_cancel, args=(directory, 60)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    path = os.path.join(directory, "booking_events.jsonl")
+    seqs = [event["seq"] for event in iter_events(path)]
+    assert seqs == list(range(1, len(seqs) + 1))
+    store = JsonBookingStore(os.path.join(directory, "bookings.json"))
+    store.load()
+    stored = {booking.id: booking.status for booking in store.all()}
+    store.close()
+    assert len(stored) == 180
+    assert {booking.id: booking.status for booking in replay(iter_events(path))} == stored
+
+def test_seq_continues_after_reopen_and_other_writers(tmp_path):
+    path = str(tmp_path / "booking_events.jsonl")
+    first = EventLog(path)
+    first.booked([make_booking(), make_booking()])
+    first.close()
+    assert last_seq(path) == 2
+
+    reopened = EventLog(path)
+    other = EventLog(path) # Stands in for another process appending in between
+    reopened.cleared()
+    other.booked([make_booking()])
+    reopened.cleared()
+    reopened.close()
+    other.close()
+    assert [event["seq"] for event in iter_events(path)] == [1, 2, 3, 4, 5]
+
+def test_torn_last_line_is_skipped_and_fenced_off(tmp_path):
+    path = str(tmp_path / "booking_events.jsonl")
+    log = EventLog(path)
+    log.booked([make_booking("kept")])
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b'{"seq": 2, "event": "boo') # A writer that crashed mid-line
+    assert last_seq(path) == 1
+    assert [event["seq"] for event in iter_events(path)] == [1]
+
+    log = EventLog(path)
+    log.cleared()
+    log.close()
+    events = list(iter_events(path)) # The torn line is now complete but unreadable, and skipped
+    assert [(event["seq"], event["event"]) for event in events] == [(1, "booked"), (2, "cleared")]
+
+def test_replay_applies_cancels_clears_and_keeps_first_duplicate():
+    booked = lambda booking: {"event": "booked", "booking": booking.to_dict()}
+    first = make_booking("a")
+    duplicate = Booking("Car (4-seater)", "CEA", "COC", 4.5, 220.0, "Cash", booking_id="a")
+    events = [
+        booked(make_booking("gone")),
+        {"event": "cleared"},
+        {"event": "cancelled", "id": "b"}, # Cancel written before its booking
+        booked(first),
+        booked(make_booking("b")),
+        booked(duplicate),
+        {"event": "cancelled", "id": "a"},
+    ]
+    bookings = replay(json.loads(json.dumps(event)) for event in events)
+    assert [(booking.id, booking.vehicle_type, booking.status) for booking in bookings] == [
+        ("a", "Enavroom-vroom", "cancelled"),
+        ("b", "Enavroom-vroom", "cancelled"),
+    ]
@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+
+import pytest
+
+from booking import Booking, DuplicateBookingError
+from bookingsystem import BookingSystem
+from storage import JsonBookingStore, SQLiteBookingStore, StoreLock
+
+
+def make_booking(start="PUP Main", end="CEA"):
+    return Booking("Enavroom-vroom", start, end, 2.0, 60.0, "Cash")
+
+def open_system(directory, journal=True):
+    return BookingSystem(os.path.join(directory, "bookings.json"), os.path.join(directory, "booking_log.txt"),
+                         journal=journal, event_file=os.path.join(directory, "booking_events.jsonl"))
+
+def close_system(system):
+    system.store.close()
+    system.log.close()
+    system.events.close()
+
+def stored_ids(directory):
+    store = JsonBookingStore(os.path.join(directory, "bookings.json"))
+    store.load()
+    ids = [booking.id for booking in store.all()]
+    store.close()
+    return ids
+
+
+def _book_and_save(directory, rounds):
+    system = open_system(directory)
+    for _ in range(rounds):
+        system.book("Enavroom-vroom", "PUP Main", "CEA", "Cash")
+        system.save()
+    close_system(system)
+
+def _save_fresh(directory, rounds):
+    # Like the GUI's shutdown save from a window that never showed the history: no load() first
+    for _ in range(rounds):
+        system = open_system(directory)
+        system.save()
+        close_system(system)
+
+def _add_to_journal(path, rounds):
+    store = JsonBookingStore(path, journal=True)
+    for _ in range(rounds):
+        store.add_many([make_booking(), make_booking()])
+    store.close()
+
+def _count_under_lock(lock_path, counter_path, rounds):
+    lock = StoreLock(lock_path)
+    for _ in range(rounds):
+        with lock: # Read, then write back one more: only safe if no other process is in between
+            with open(counter_path) as f:
+                count = int(f.read())
+            with open(counter_path, "w") as f:
+                f.write(str(count + 1))
+    lock.close()
+
+def run_processes(*jobs):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=target, args=args) for target, args in jobs]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+def test_save_on_unloaded_system_keeps_stored_bookings(tmp_path):
+    run_processes((_book_and_save, (str(tmp_path), 3)))
+    run_processes((_save_fresh, (str(tmp_path), 1)))
+    assert len(stored_ids(str(tmp_path))) == 3
+
+def test_processes_saving_keep_each_others_bookings(tmp_path):
+    directory = str(tmp_path)
+    run_processes((_book_and_save, (directory, 50)), (_book_and_save, (directory, 50)), (_save_fresh, (directory, 50)))
+    ids = stored_ids(directory)
+    assert len(ids) == 100
+    assert len(set(ids)) == 100
+
+def test_processes_appending_to_journal_keep_every_booking(tmp_path):
+    path = str(tmp_path / "bookings.json")
+    run_processes(*[(_add_to_journal, (path, 100))] * 3)
+    ids = stored_ids(str(tmp_path))
+    assert len(ids) == 600
+    assert len(set(ids)) == 600
+
+def test_store_lock_excludes_other_processes(tmp_path):
+    counter = tmp_path / "counter"
+    counter.write_text("0")
+    lock_path = str(tmp_path / "counter.lock")
+    run_processes(*[(_count_under_lock, (lock_path, str(counter), 200))] * 3)
+    assert counter.read_text() == "600"
+
+def test_store_lock_is_reentrant(tmp_path):
+    lock = StoreLock(str(tmp_path / "store.lock"))
+    with lock:
+        with lock:
+            pass
+        with lock:
+            pass
+    lock.close()
+
+def test_load_picks_up_journal_appended_by_another_store(tmp_path):
+    path = str(tmp_path / "bookings.json")
+    reader = JsonBookingStore(path, journal=True)
+    reader.load()
+    assert reader.count() == 0
+
+    writer = JsonBookingStore(path, journal=True)
+    first, second = make_booking(), make_booking("CEA", "COC")
+    writer.add_many([first, second])
+    reader.load()
+    assert [booking.id for booking in reader.all()] == [first.id, second.id]
+
+    writer.set_status(first.id, "cancelled")
+    writer.add(make_booking())
+    reader.load()
+    assert reader.get(first.id).status == "cancelled"
+    assert reader.count() == 3
+    assert reader.count(status="cancelled") == 1
+
+    writer.compact() # Folds the journal into the snapshot; the reader must still see the same bookings
+    reader.load()
+    assert reader.count() == 3
+    assert reader.get(first.id).status == "cancelled"
+    writer.close()
+    reader.close()
+
+
+def test_generated_ids_are_full_uuids():
+    ids = {make_booking().id for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(len(booking_id) == 32 for booking_id in ids)
+
+def test_duplicate_id_is_rejected_not_overwritten(tmp_path):
+    store = JsonBookingStore(str(tmp_path / "bookings.json"), journal=True)
+    first = Booking("Enavroom-vroom", "PUP Main", "CEA", 2.0, 60.0, "Cash", booking_id="same")
+    second = Booking("Car (4-seater)", "CEA", "COC", 4.5, 220.0, "Cash", booking_id="same")
+    other = make_booking()
+    assert store.add_many([first, second, other]) == [second]
+    with pytest.raises(DuplicateBookingError):
+        store.add(second)
+    assert store.get("same") is first
+    store.close()
+
+    reloaded = JsonBookingStore(str(tmp_path / "bookings.json"), journal=True)
+    reloaded.load()
+    assert [booking.id for booking in reloaded.all()] == ["same", other.id]
+    assert reloaded.get("same").vehicle_type == "Enavroom-vroom"
+    reloaded.close()
+
+def test_sqlite_duplicate_id_fails_only_that_booking(tmp_path):
+    store = SQLiteBookingStore(str(tmp_path / "bookings.db"))
+    taken = Booking("Enavroom-vroom", "PUP Main", "CEA", 2.0, 60.0, "Cash", booking_id="taken")
+    store.add(taken)
+    with pytest.raises(DuplicateBookingError):
+        store.add(Booking("Car (4-seater)", "CEA", "COC", 4.5, 220.0, "Cash", booking_id="taken"))
+    clash = Booking("Car (6-seater)", "CEA", "COC", 4.5, 310.0, "Cash", booking_id="taken")
+    batch = [make_booking(), clash, make_booking()]
+    assert store.add_many(batch) == [clash]
+    assert store.count() == 3
+    assert store.get("taken").cost == 60.0
+    store.close()